@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 from .routes import router
+from .responses import ORJSONResponse
 from .schemas import *
 
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+请求微批合并
+============
+将短时间窗口内并发到达的单条请求合并为一批，统一做一次批量推理
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+
+class BatchCoalescer:
+    """
+    微批合并器
+
+    使用示例：
+    ```python
+    async def handler(texts):
+        return [t.upper() for t in texts]
+
+    coalescer = BatchCoalescer(handler, max_batch_size=16, max_wait_ms=10)
+    future = await coalescer.submit("hallo")
+    result = await future
+    ```
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10
+    ):
+        """
+        Args:
+            handler: 批处理协程函数，输入列表，返回等长结果列表
+            max_batch_size: 单批最大条数
+            max_wait_ms: 攒批最长等待时间（毫秒）
+        """
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+
+        # 在首次提交时创建，保证绑定到当前运行的事件循环
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._flushing: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> asyncio.Future:
+        """提交单条数据，返回结果Future"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._collect())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return future
+
+    async def close(self):
+        """停止后台任务"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _collect(self):
+        """后台攒批：取到第一条后，在等待窗口内尽量凑满一批"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # 批次并发执行，总并发由推理线程池限制
+            task = asyncio.create_task(self._flush(batch))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """
+        执行一批并分发结果
+
+        整批失败时回退逐条执行，单条输入出错只影响它自己的请求
+        """
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                await asyncio.gather(*(self._flush([entry]) for entry in batch))
+                return
+            future = batch[0][1]
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
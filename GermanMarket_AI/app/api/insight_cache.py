@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+共享结果缓存
+============
+基于 Redis 的评论分析结果缓存，多个 worker / 重启之间共享
+"""
+
+from typing import List, Optional
+
+import orjson
+
+from app.services.cache import text_digest
+from app.services.review_analyzer import ReviewInsight
+
+
+class InsightCache:
+    """
+    Redis 分析结果缓存
+
+    使用示例：
+    ```python
+    cache = InsightCache.from_url("redis://localhost:6379/0")
+    cached = await cache.get_many(texts)   # 未命中的位置为 None
+    await cache.set_many(new_insights)
+    ```
+    """
+
+    def __init__(self, client, ttl: int = 86400, prefix: bytes = b"rev:"):
+        """
+        Args:
+            client: redis.asyncio.Redis 客户端
+            ttl: 过期时间（秒）
+            prefix: 键前缀
+        """
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: int = 86400) -> "InsightCache":
+        import redis.asyncio as redis
+        return cls(redis.from_url(url), ttl=ttl)
+
+    def _key(self, text: str) -> bytes:
+        return self.prefix + text_digest(text)
+
+    async def get_many(self, texts: List[str]) -> List[Optional[ReviewInsight]]:
+        """批量查询（一次 MGET），Redis 不可用时全部视为未命中"""
+        if not texts:
+            return []
+        try:
+            values = await self.client.mget([self._key(t) for t in texts])
+        except Exception as e:
+            print(f"⚠️ Redis读取失败: {e}")
+            return [None] * len(texts)
+        return [ReviewInsight(**orjson.loads(v)) if v else None for v in values]
+
+    async def set_many(self, insights: List[ReviewInsight]):
+        """批量写入（一次 pipeline 往返）"""
+        if not insights:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for insight in insights:
+                    # orjson 直接序列化 dataclass，无需先 asdict() 深拷贝成字典
+                    pipe.setex(self._key(insight.original_text), self.ttl, orjson.dumps(insight))
+                await pipe.execute()
+        except Exception as e:
+            print(f"⚠️ Redis写入失败: {e}")
+
+    async def close(self):
+        await self.client.aclose()
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+响应类
+======
+基于 orjson 的 JSON 响应（原生支持 datetime / numpy，编码速度远快于标准库 json）
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """orjson编码的JSON响应（应用默认响应类）"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
@@ -5,12 +5,23 @@ API路由定义
 FastAPI路由，提供RESTful接口
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache, partial
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, insert, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.core.database import get_async_db
-from app.services.review_analyzer import ReviewAnalyzer
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_async_db
+from app.services.review_analyzer import ReviewAnalyzer, ReviewInsight
+from .batching import BatchCoalescer
+from .insight_cache import InsightCache
+from .responses import ORJSONResponse
 from .schemas import (
     ReviewAnalyzeRequest,
     ReviewBatchRequest,
@@ -28,46 +39,139 @@ from .schemas import (
 # 创建路由器
 router = APIRouter()
 
-# 全局分析器实例（复用模型）
-_analyzer = None
+# 推理线程池：模型推理是同步阻塞调用，放到线程池执行，避免阻塞事件循环
+_executor = ThreadPoolExecutor(
+    max_workers=settings.nlp.inference_workers,
+    thread_name_prefix="nlp-inference"
+)
+
+async def run_blocking(func, *args, **kwargs):
+    """在推理线程池中执行阻塞调用（并发数由 max_workers 限制）"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+
+def create_analyzer() -> ReviewAnalyzer:
+    """按配置创建评论分析器"""
+    return ReviewAnalyzer(
+        translate=True,
+        sentiment_kwargs={
+            "model_name": settings.nlp.sentiment_model,
+            "device": settings.nlp.device,
+            "threshold_positive": settings.threshold_positive,
+            "threshold_negative": settings.threshold_negative,
+            "quantized": settings.nlp.quantized,
+            "onnx_providers": settings.nlp.onnx_providers,
+            "cache_dir": str(settings.nlp.cache_dir)
+        },
+        translator_kwargs={
+            "model_de_zh": settings.nlp.translation_de_zh,
+            "model_de_en": settings.nlp.translation_de_en,
+            "device": settings.nlp.device
+        }
+    )
 
-def get_analyzer() -> ReviewAnalyzer:
-    global _analyzer
-    if _analyzer is None:
-        _analyzer = ReviewAnalyzer(translate=True)
-    return _analyzer
+
+async def analyze_texts(
+    analyzer: ReviewAnalyzer,
+    texts: List[str],
+    cache: Optional[InsightCache] = None,
+    chunk_size: Optional[int] = None
+) -> List[ReviewInsight]:
+    """
+    批量推理，返回与输入顺序一致的单条结果
+    
+    先一次 MGET 查询共享缓存，只对未命中的评论推理；推理按 chunk_size 分块提交线程池，
+    单个任务不会长时间占用线程，客户端断开时也能在块之间中止
+    """
+    results = await cache.get_many(texts) if cache else [None] * len(texts)
+    missing = [i for i, r in enumerate(results) if r is None]
+    if not missing:
+        return results
+    
+    pending = [texts[i] for i in missing]
+    chunk_size = chunk_size or len(pending)
+    computed = []
+    for start in range(0, len(pending), chunk_size):
+        computed.extend(await run_blocking(analyzer.analyze_many, pending[start:start + chunk_size]))
+    
+    for i, insight in zip(missing, computed):
+        results[i] = insight
+    if cache:
+        await cache.set_many(computed)
+    
+    return results
+
+
+def create_coalescer(analyzer: ReviewAnalyzer, cache: Optional[InsightCache] = None) -> BatchCoalescer:
+    """创建单条分析请求的微批合并器"""
+    return BatchCoalescer(
+        partial(analyze_texts, analyzer, cache=cache),
+        max_batch_size=settings.nlp.batch_size,
+        max_wait_ms=settings.nlp.batch_wait_ms
+    )
+
+
+def create_insight_cache() -> Optional[InsightCache]:
+    """配置了 REDIS_URL 时创建跨 worker 共享的结果缓存"""
+    if not settings.redis_url:
+        return None
+    return InsightCache.from_url(settings.redis_url, ttl=settings.redis_ttl)
+
+
+# 分析器、合并器与共享缓存在应用启动时创建（见 main.lifespan），这里通过依赖注入获取
+
+def get_analyzer(request: Request) -> ReviewAnalyzer:
+    return request.app.state.analyzer
+
+def get_coalescer(request: Request) -> BatchCoalescer:
+    return request.app.state.coalescer
+
+def get_insight_cache(request: Request) -> Optional[InsightCache]:
+    return request.app.state.insight_cache
 
 
 # ============ 评论分析路由 ============
 
 @router.post("/analyze/single", response_model=ReviewInsightResponse, tags=["评论分析"])
-async def analyze_single_review(request: ReviewAnalyzeRequest):
+async def analyze_single_review(
+    request: ReviewAnalyzeRequest,
+    coalescer: BatchCoalescer = Depends(get_coalescer)
+):
     """
     分析单条德语评论
     
     返回情感分析、维度分析、关键词、翻译等完整结果
+    （并发请求会在短窗口内合并为一批推理）
     """
-    analyzer = get_analyzer()
-    
     try:
-        insight = analyzer.analyze_single(request.text)
-        return insight.to_dict()
+        future = await coalescer.submit(request.text)
+        insight = await future
+        # to_dict() 已是响应结构，直接返回 Response，跳过 response_model 的二次校验
+        return ORJSONResponse(insight.to_dict())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/analyze/batch", response_model=ReviewReportResponse, tags=["评论分析"])
-async def analyze_batch_reviews(request: ReviewBatchRequest):
+async def analyze_batch_reviews(
+    request: ReviewBatchRequest,
+    analyzer: ReviewAnalyzer = Depends(get_analyzer),
+    cache: Optional[InsightCache] = Depends(get_insight_cache)
+):
     """
     批量分析德语评论
     
     返回汇总报告，包含情感分布、维度统计、关键洞察等
     """
-    analyzer = get_analyzer()
-    
     try:
-        report = analyzer.analyze_batch(request.reviews, show_progress=False)
-        return {
+        analyzed_at = datetime.now()
+        reviews = await analyze_texts(
+            analyzer, request.reviews, cache=cache, chunk_size=settings.nlp.batch_size
+        )
+        
+        report = analyzer.summarize(reviews, analyzed_at, include_reviews=False)
+        return ORJSONResponse({
             "total_reviews": report.total_reviews,
             "analyzed_at": report.analyzed_at,
             "sentiment_distribution": report.sentiment_distribution,
@@ -76,7 +180,7 @@ async def analyze_batch_reviews(request: ReviewBatchRequest):
             "top_positive_keywords": report.top_positive_keywords,
             "top_negative_keywords": report.top_negative_keywords,
             "key_insights": report.key_insights
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -111,29 +215,102 @@ async def create_influencer(
     return influencer
 
 
+# 批量写入时每次 executemany 的行数
+BULK_INSERT_CHUNK = 500
+
+
+@router.post("/influencers/bulk", response_model=SuccessResponse, tags=["红人管理"])
+async def bulk_create_influencers(
+    items: List[InfluencerCreateRequest],
+    db: AsyncSession = Depends(get_async_db)
+):
+    """批量创建红人档案（分块 executemany，单次提交）"""
+    from app.models.schema import Influencer
+    
+    rows = [item.model_dump() for item in items]
+    
+    for start in range(0, len(rows), BULK_INSERT_CHUNK):
+        await db.execute(insert(Influencer), rows[start:start + BULK_INSERT_CHUNK])
+    await db.commit()
+    
+    return SuccessResponse(
+        message=f"成功导入 {len(rows)} 位红人",
+        data={"count": len(rows)}
+    )
+
+
+@lru_cache(maxsize=None)
+def _eager_load_options(model) -> tuple:
+    """
+    模型全部关系的 selectinload 选项
+    
+    异步会话不支持隐式懒加载，逐行访问关系还会产生 N+1 查询；
+    红人查询统一带上这些选项，新增关系字段（建联记录、内容等）时自动以一条 IN 查询批量加载
+    """
+    return tuple(selectinload(rel.class_attribute) for rel in inspect(model).relationships)
+
+
+def _filter_influencers(query, influencer_model, platform: str = None, status: str = None):
+    """附加红人列表的筛选条件"""
+    if platform:
+        query = query.where(influencer_model.platform == platform)
+    if status:
+        query = query.where(influencer_model.status == status)
+    return query
+
+
 @router.get("/influencers", response_model=List[InfluencerResponse], tags=["红人管理"])
 async def list_influencers(
+    response: Response,
     platform: str = None,
     status: str = None,
     skip: int = 0,
     limit: int = 50,
     db: AsyncSession = Depends(get_async_db)
 ):
-    """获取红人列表"""
-    from sqlalchemy import select
+    """获取红人列表（响应头 X-Total-Count 为符合条件的总数）"""
     from app.models.schema import Influencer
     
-    query = select(Influencer)
+    # 总数通过窗口函数随分页结果一并返回，省去单独的 COUNT 查询
+    query = _filter_influencers(
+        select(Influencer, func.count().over().label("total")),
+        Influencer, platform, status
+    ).options(*_eager_load_options(Influencer))
+    result = await db.execute(query.offset(skip).limit(limit))
+    rows = result.all()
     
-    if platform:
-        query = query.where(Influencer.platform == platform)
-    if status:
-        query = query.where(Influencer.status == status)
+    if rows:
+        total = rows[0].total
+    elif skip:
+        # 页码越界时窗口函数没有行可返回，单独计数
+        total = await db.scalar(
+            _filter_influencers(select(func.count()).select_from(Influencer), Influencer, platform, status)
+        )
+    else:
+        total = 0
+    response.headers["X-Total-Count"] = str(total)
+    
+    return [row.Influencer for row in rows]
+
+
+@router.get("/influencers/stream", tags=["红人管理"])
+async def stream_influencers(platform: str = None, status: str = None):
+    """导出红人列表（NDJSON 流式返回，不在内存中物化全部结果）"""
+    from app.models.schema import Influencer
+    
+    query = _filter_influencers(
+        select(Influencer).options(*_eager_load_options(Influencer)),
+        Influencer, platform, status
+    )
     
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
+    async def generate():
+        # 会话随流的生命周期创建和关闭
+        async with AsyncSessionLocal() as session:
+            result = await session.stream_scalars(query.execution_options(yield_per=500))
+            async for influencer in result:
+                yield InfluencerResponse.model_validate(influencer).model_dump_json() + "\n"
     
-    return result.scalars().all()
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @router.get("/influencers/{influencer_id}", response_model=InfluencerResponse, tags=["红人管理"])
@@ -142,11 +319,12 @@ async def get_influencer(
     db: AsyncSession = Depends(get_async_db)
 ):
     """获取单个红人详情"""
-    from sqlalchemy import select
     from app.models.schema import Influencer
     
     result = await db.execute(
-        select(Influencer).where(Influencer.id == influencer_id)
+        select(Influencer)
+        .where(Influencer.id == influencer_id)
+        .options(*_eager_load_options(Influencer))
     )
     influencer = result.scalar_one_or_none()
     
@@ -5,9 +5,9 @@ API请求/响应模型
 使用Pydantic定义API数据结构
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Literal, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 # ============ 评论分析 ============
@@ -20,7 +20,7 @@ class ReviewAnalyzeRequest(BaseModel):
 
 class ReviewBatchRequest(BaseModel):
     """批量评论分析请求"""
-    reviews: List[str] = Field(..., min_items=1, max_items=100)
+    reviews: List[str] = Field(..., min_length=1, max_length=100)
     translate: bool = Field(default=True)
 
 
@@ -51,7 +51,7 @@ class ReviewReportResponse(BaseModel):
 class InfluencerCreateRequest(BaseModel):
     """创建红人请求"""
     name: str = Field(..., min_length=1)
-    platform: str = Field(..., pattern="^(instagram|tiktok|youtube)$")
+    platform: Literal["instagram", "tiktok", "youtube"]
     handle: Optional[str] = None
     profile_url: Optional[str] = None
     email: Optional[str] = None
@@ -73,14 +73,13 @@ class InfluencerResponse(BaseModel):
     status: str
     score: Optional[float]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ContactRecordRequest(BaseModel):
     """创建建联记录请求"""
     influencer_id: int
-    contact_type: str = Field(default="email", pattern="^(email|dm|comment)$")
+    contact_type: Literal["email", "dm", "comment"] = "email"
     subject: Optional[str] = None
     content: str
 
@@ -89,12 +88,12 @@ class ContactRecordRequest(BaseModel):
 
 class ContentGenerateRequest(BaseModel):
     """内容生成请求"""
-    content_type: str = Field(..., pattern="^(product_desc|ad_copy|outreach_email|social_post)$")
+    content_type: Literal["product_desc", "ad_copy", "outreach_email", "social_post"]
     product_name: str
     product_info: Optional[str] = None
     target_audience: Optional[str] = Field(default="德国消费者")
     tone: Optional[str] = Field(default="professional", description="professional/casual/friendly")
-    language: str = Field(default="de", pattern="^(de|en)$")
+    language: Literal["de", "en"] = "de"
 
 
 class ContentResponse(BaseModel):
@@ -7,7 +7,7 @@ GermanMarket.AI 核心配置
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from functools import lru_cache
 
 from pydantic import Field
@@ -25,11 +25,14 @@ class DatabaseConfig(BaseSettings):
     user: str = Field(default="root", alias="DB_USER")
     password: str = Field(default="", alias="DB_PASSWORD")
     database: str = Field(default="german_market_ai", alias="DB_NAME")
+    driver: str = Field(default="asyncmy", alias="DB_DRIVER", description="异步驱动: asyncmy/aiomysql")
     
     # 连接池配置
-    pool_size: int = Field(default=5)
-    max_overflow: int = Field(default=10)
+    pool_size: int = Field(default=25, alias="DB_POOL_SIZE")
+    max_overflow: int = Field(default=10, alias="DB_MAX_OVERFLOW")
     pool_timeout: int = Field(default=30)
+    pool_recycle: int = Field(default=1800, alias="DB_POOL_RECYCLE")  # 连接最长复用时间（秒），早于MySQL wait_timeout
+    pool_pre_ping: bool = Field(default=False, alias="DB_POOL_PRE_PING")  # 每次取连接前 SELECT 1
     
     @property
     def url(self) -> str:
@@ -39,7 +42,7 @@ class DatabaseConfig(BaseSettings):
     @property
     def async_url(self) -> str:
         """异步连接URL"""
-        return f"mysql+aiomysql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}?charset=utf8mb4"
+        return f"mysql+{self.driver}://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}?charset=utf8mb4"
 
 
 class NLPConfig(BaseSettings):
@@ -61,8 +64,14 @@ class NLPConfig(BaseSettings):
     # 推理配置
     device: str = Field(default="auto")
     batch_size: int = Field(default=16)
+    batch_wait_ms: int = Field(default=10, description="单条请求攒批等待时间（毫秒）")
     max_length: int = Field(default=512)
+    inference_workers: int = Field(default=4, description="推理线程池大小（限制并发推理数）")
     cache_dir: Path = Field(default=PROJECT_ROOT / "cache" / "models")
+    
+    # CPU推理使用INT8量化ONNX模型（需安装 optimum[onnxruntime]，未安装时自动回退）
+    quantized: bool = Field(default=True)
+    onnx_providers: List[str] = Field(default=["CUDAExecutionProvider", "CPUExecutionProvider"])
 
 
 class AppSettings(BaseSettings):
@@ -83,6 +92,11 @@ class AppSettings(BaseSettings):
     # 服务器配置
     host: str = Field(default="0.0.0.0")
     port: int = Field(default=8000)
+    preload_models: bool = Field(default=False, alias="PRELOAD_MODELS")  # 导入应用时加载模型（配合 gunicorn --preload）
+    
+    # 共享结果缓存（未配置时只使用进程内缓存）
+    redis_url: Optional[str] = Field(default=None, alias="REDIS_URL")
+    redis_ttl: int = Field(default=86400, alias="REDIS_TTL")
     
     # 子配置
     db: DatabaseConfig = Field(default_factory=DatabaseConfig)
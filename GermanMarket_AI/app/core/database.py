@@ -8,6 +8,7 @@
 from contextlib import asynccontextmanager, contextmanager
 from typing import AsyncGenerator, Generator
 
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
@@ -24,6 +25,7 @@ sync_engine = create_engine(
     pool_size=settings.db.pool_size,
     max_overflow=settings.db.max_overflow,
     pool_timeout=settings.db.pool_timeout,
+    pool_recycle=settings.db.pool_recycle,
     pool_pre_ping=True,  # 自动检测连接有效性
     echo=settings.debug
 )
@@ -41,7 +43,12 @@ async_engine = create_async_engine(
     pool_size=settings.db.pool_size,
     max_overflow=settings.db.max_overflow,
     pool_timeout=settings.db.pool_timeout,
-    pool_pre_ping=True,
+    pool_recycle=settings.db.pool_recycle,
+    # 默认不做 pre_ping（省去每次取连接的一次往返）：依靠 pool_recycle 提前淘汰空闲连接，
+    # 遇到断连错误时 SQLAlchemy 会自动作废整个连接池，后续请求拿到新连接
+    pool_pre_ping=settings.db.pool_pre_ping,
+    json_serializer=lambda obj: orjson.dumps(obj).decode(),
+    json_deserializer=orjson.loads,
     echo=settings.debug
 )
 
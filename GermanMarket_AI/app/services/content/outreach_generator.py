@@ -6,10 +6,44 @@
 严格遵守德国GDPR/反垃圾邮件法规
 """
 
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from typing import List, Dict, Optional, Literal
 from enum import Enum
+from functools import lru_cache
+import hashlib
 import random
+import re
+import string
+import sys
+from types import MappingProxyType
+
+
+# 语义缓存中代替红人名称的占位符（命中时替换为真实名称）
+_NAME_SENTINEL = "\x00influencer\x00"
+
+
+def _stable_seed(*parts: str) -> int:
+    """由字符串计算跨进程稳定的随机种子（内置 hash() 对 str 做了随机化）"""
+    digest = hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class _SafeDict(dict):
+    """模板填充用字典：缺失的占位符替换为空字符串"""
+    def __missing__(self, key):
+        return ""
+
+
+def _freeze(obj):
+    """把只读模板数据递归冻结：dict -> 只读映射，list -> tuple，字符串驻留"""
+    if isinstance(obj, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(item) for item in obj)
+    if isinstance(obj, str):
+        return sys.intern(obj)
+    return obj
 
 
 class ToneMode(Enum):
@@ -18,7 +52,7 @@ class ToneMode(Enum):
     FRIENDLY = "friendly"       # 社交媒体亲和
 
 
-@dataclass
+@dataclass(slots=True)
 class OutreachContext:
     """开发信上下文"""
     # 红人信息
@@ -52,7 +86,7 @@ class OutreachContext:
     company_phone: str = ""       # Impressum需要
 
 
-@dataclass
+@dataclass(slots=True)
 class GeneratedOutreach:
     """生成的开发信"""
     subject: str
@@ -74,7 +108,7 @@ class GeneratedOutreach:
 # ============ 德语商务俚语库 ============
 # 这是RAG检索的核心知识库
 
-GERMAN_BUSINESS_PHRASES = {
+GERMAN_BUSINESS_PHRASES = _freeze({
     "greetings": {
         "formal": [
             "Sehr geehrte/r {name}",
@@ -151,12 +185,12 @@ GERMAN_BUSINESS_PHRASES = {
             "Bis bald",
         ]
     }
-}
+})
 
 
 # ============ GDPR/反垃圾邮件合规模板 ============
 
-GDPR_COMPLIANCE = {
+GDPR_COMPLIANCE = _freeze({
     # 必须包含的法律告知（德国UWG反垃圾邮件法）
     "opt_out_notice": {
         "formal": "\n\nHinweis: Falls Sie keine weiteren Nachrichten von uns erhalten möchten, teilen Sie uns dies bitte mit.",
@@ -174,12 +208,12 @@ GDPR_COMPLIANCE = {
 
     # Double Opt-in 提示（用于后续邮件）
     "double_optin_request": "Um sicherzustellen, dass Sie unsere Nachrichten erhalten möchten, bitten wir Sie um eine kurze Bestätigung."
-}
+})
 
 
 # ============ 主题行模板 ============
 
-SUBJECT_TEMPLATES = {
+SUBJECT_TEMPLATES = _freeze({
     "formal": [
         "Kooperationsanfrage: {brand} x {influencer}",
         "Partnerschaftsmöglichkeit mit {brand}",
@@ -190,7 +224,31 @@ SUBJECT_TEMPLATES = {
         "{brand} 💜 {influencer} - Let's collaborate!",
         "Coole Idee für dich von {brand}!",
     ]
-}
+})
+
+
+# ============ 红人语气词 ============
+
+_CASUAL_INDICATORS = frozenset({"mega", "super", "krass", "geil", "nice", "😍", "🔥"})
+_FORMAL_INDICATORS = frozenset({"qualität", "nachhaltig", "empfehlen", "erfahrung"})
+
+# 按语气预先索引的俚语库：tone -> category -> phrases（只读，所有生成器实例共用）
+_PHRASES_BY_TONE = _freeze({
+    tone: {
+        category: tone_phrases.get(tone.value, ())
+        for category, tone_phrases in GERMAN_BUSINESS_PHRASES.items()
+    }
+    for tone in ToneMode
+})
+
+# 按语气预取的GDPR文案：tone -> (退订提示, 数据保护声明)
+_GDPR_BY_TONE = _freeze({
+    tone: (
+        GDPR_COMPLIANCE["opt_out_notice"][tone.value],
+        GDPR_COMPLIANCE["data_protection"][tone.value]
+    )
+    for tone in ToneMode
+})
 
 
 class OutreachGenerator:
@@ -220,65 +278,95 @@ class OutreachGenerator:
     ```
     """
 
+    # 俚语检索结果（俚语库只读，所有实例共用）：tone -> 检索文本
+    _RETRIEVED_CACHE: Dict[ToneMode, str] = {}
+
     def __init__(
         self,
         tone: ToneMode = ToneMode.FORMAL,
         include_gdpr: bool = True,
-        llm_client = None  # 可选的LLM客户端
+        llm_client = None,  # 可选的LLM客户端
+        seed: Optional[int] = None,
+        preview_cache_size: int = 512,
+        semantic_cache_size: int = 0
     ):
+        """
+        Args:
+            tone: 语气模式
+            include_gdpr: 是否附加GDPR合规内容
+            llm_client: 可选的LLM客户端
+            seed: deterministic 模式下的固定随机种子，None 时由上下文计算
+            preview_cache_size: deterministic 预览结果的缓存条数
+            semantic_cache_size: 语义缓存条数，0表示关闭。开启后除红人名称外内容相同的上下文
+                复用同一份生成结果（模板选择不再每次随机）
+        """
         self.tone = tone
         self.include_gdpr = include_gdpr
         self.llm_client = llm_client
+        self.seed = seed
+        self.preview_cache_size = preview_cache_size
+        self._preview_cache: "OrderedDict[tuple, Dict[str, GeneratedOutreach]]" = OrderedDict()
+        self._system_prompt_by_tone: Dict[ToneMode, str] = {}
+        self.semantic_cache_size = semantic_cache_size
+        self._semantic_cache: "OrderedDict[tuple, GeneratedOutreach]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # 实例自带的随机数生成器，不与其他生成器共用全局 random 的状态
+        self._rng = random.Random()
         self._phrases = GERMAN_BUSINESS_PHRASES
+        # 按语气索引的俚语库与GDPR文案在模块加载时构建一次，实例只引用
+        self._phrases_by_tone = _PHRASES_BY_TONE
+        self._gdpr_by_tone = _GDPR_BY_TONE
+        self._rebuild_phrase_cache()
 
     def set_tone(self, tone: ToneMode):
         """切换语气模式"""
         self.tone = tone
+        self._rebuild_phrase_cache()
 
-    def _get_phrase(self, category: str, **kwargs) -> str:
-        """从俚语库获取短语"""
-        tone_key = self.tone.value
-        phrases = self._phrases.get(category, {}).get(tone_key, [])
+    def _rebuild_phrase_cache(self):
+        """刷新当前语气的短语表与GDPR文案（语气变化后调用）"""
+        self._phrase_cache = self._phrases_by_tone[self.tone]
+        self._gdpr_opt_out, self._gdpr_data_protection = self._gdpr_by_tone[self.tone]
+
+    def _get_phrase(self, category: str, tone: ToneMode = None, rng=None, **kwargs) -> str:
+        """从俚语库获取短语（tone 默认为当前语气，rng 默认为实例自带的随机数生成器）"""
+        table = self._phrase_cache if tone is None or tone is self.tone else self._phrases_by_tone[tone]
+        phrases = table.get(category)
 
         if not phrases:
             return ""
 
-        phrase = random.choice(phrases)
-
-        # 替换占位符
-        for key, value in kwargs.items():
-            phrase = phrase.replace(f"{{{key}}}", str(value))
+        # 一次 format_map 填充全部占位符
+        return (rng or self._rng).choice(phrases).format_map(_SafeDict(kwargs))
 
-        return phrase
-
-    def _build_subject(self, context: OutreachContext) -> str:
+    def _build_subject(self, context: OutreachContext, tone: ToneMode = None, rng=None) -> str:
         """生成主题行"""
-        tone_key = self.tone.value
+        tone_key = (tone or self.tone).value
         templates = SUBJECT_TEMPLATES.get(tone_key, SUBJECT_TEMPLATES["formal"])
 
-        subject = random.choice(templates)
-        subject = subject.replace("{brand}", context.brand_name or "Uns")
-        subject = subject.replace("{influencer}", context.influencer_name)
-
-        return subject
+        return (rng or self._rng).choice(templates).format_map(_SafeDict(
+            brand=context.brand_name or "Uns",
+            influencer=context.influencer_name
+        ))
 
-    def _build_body(self, context: OutreachContext) -> str:
+    def _build_body(self, context: OutreachContext, tone: ToneMode = None, rng=None) -> str:
         """构建邮件正文"""
         parts = []
 
         # 1. 称呼
-        greeting = self._get_phrase("greetings", name=context.influencer_name)
+        greeting = self._get_phrase("greetings", tone, rng, name=context.influencer_name)
         parts.append(f"{greeting},\n")
 
         # 2. 开场白（个性化hook）
         topic = context.recent_content_topics[0] if context.recent_content_topics else context.niche
-        opening = self._get_phrase("opening_hooks", niche=context.niche, topic=topic)
+        opening = self._get_phrase("opening_hooks", tone, rng, niche=context.niche, topic=topic)
         parts.append(opening)
 
         # 3. 价值主张
         highlight = context.product_highlights[0] if context.product_highlights else "höchste Qualität"
         value_prop = self._get_phrase(
-            "value_proposition",
+            "value_proposition", tone, rng,
             brand=context.brand_name,
             product=context.product_name,
             highlight=highlight
@@ -287,71 +375,137 @@ class OutreachGenerator:
 
         # 4. 合作邀请
         collab_ask = self._get_phrase(
-            "collaboration_ask",
+            "collaboration_ask", tone, rng,
             product=context.product_name,
             collab_type=context.collaboration_type or "Zusammenarbeit"
         )
         parts.append(f"\n\n{collab_ask}")
 
         # 5. 结束语
-        closing = self._get_phrase("closing")
+        closing = self._get_phrase("closing", tone, rng)
         parts.append(f"\n\n{closing}")
 
         # 6. 签名
-        sign_off = self._get_phrase("sign_off")
-        signature = f"\n\n{sign_off}"
-        if context.sender_name:
-            signature += f"\n{context.sender_name}"
-        if context.sender_title:
-            signature += f"\n{context.sender_title}"
-        if context.company_name:
-            signature += f"\n{context.company_name}"
-        parts.append(signature)
+        sign_off = self._get_phrase("sign_off", tone, rng)
+        parts.append(f"\n\n{sign_off}")
+        for line in (context.sender_name, context.sender_title, context.company_name):
+            if line:
+                parts.append(f"\n{line}")
 
         return "".join(parts)
 
-    def _add_gdpr_compliance(self, body: str, context: OutreachContext) -> tuple:
+    def _add_gdpr_compliance(self, body: str, context: OutreachContext, tone: ToneMode = None) -> tuple:
         """添加GDPR合规内容"""
         compliance_notes = []
-        tone_key = self.tone.value
+        if tone is None or tone is self.tone:
+            opt_out, data_protection = self._gdpr_opt_out, self._gdpr_data_protection
+        else:
+            opt_out, data_protection = self._gdpr_by_tone[tone]
 
         # 1. 退订提示（UWG要求）
-        opt_out = GDPR_COMPLIANCE["opt_out_notice"][tone_key]
-        body += opt_out
         compliance_notes.append("✓ 包含退订选项 (UWG §7)")
 
         # 2. 数据保护声明
-        data_protection = GDPR_COMPLIANCE["data_protection"][tone_key]
-        body += data_protection
         compliance_notes.append("✓ 数据保护声明 (GDPR Art.13)")
 
-        return body, compliance_notes
+        return "".join([body, opt_out, data_protection]), compliance_notes
 
-    def generate(self, context: OutreachContext) -> GeneratedOutreach:
+    def generate(self, context: OutreachContext, deterministic: bool = False) -> GeneratedOutreach:
         """
         生成开发信
 
         Args:
             context: 开发信上下文信息
+            deterministic: 为True时用由上下文决定的独立随机数生成器选模板，相同输入输出一致
 
         Returns:
             GeneratedOutreach: 包含主题、正文、合规信息的完整开发信
         """
+        if deterministic:
+            return self._generate_with_tone(self.tone, context, random.Random(self._context_seed(context)))
+        if self.semantic_cache_size > 0:
+            return self._generate_cached(context)
+        return self._generate_with_tone(self.tone, context)
+
+    def _semantic_key(self, context: OutreachContext) -> tuple:
+        """语义缓存键：除红人名称外所有影响输出的字段"""
+        return (
+            self.tone,
+            self.include_gdpr,
+            context.niche,
+            context.recent_content_topics[0] if context.recent_content_topics else None,
+            context.brand_name,
+            context.product_name,
+            context.product_highlights[0] if context.product_highlights else None,
+            context.collaboration_type,
+            context.sender_name,
+            context.sender_title,
+            context.company_name,
+        )
+
+    def _generate_cached(self, context: OutreachContext) -> GeneratedOutreach:
+        """语义缓存生成：缓存以占位符代替红人名称的结果，命中时只做名称替换"""
+        key = self._semantic_key(context)
+        template = self._semantic_cache.get(key)
+        if template is None:
+            self.cache_misses += 1
+            template = self._generate_with_tone(
+                self.tone, replace(context, influencer_name=_NAME_SENTINEL)
+            )
+            self._semantic_cache[key] = template
+            while len(self._semantic_cache) > self.semantic_cache_size:
+                self._semantic_cache.popitem(last=False)
+        else:
+            self.cache_hits += 1
+            self._semantic_cache.move_to_end(key)
+
+        name = context.influencer_name
+        return GeneratedOutreach(
+            subject=template.subject.replace(_NAME_SENTINEL, name),
+            body=template.body.replace(_NAME_SENTINEL, name),
+            tone_mode=template.tone_mode,
+            gdpr_compliant=template.gdpr_compliant,
+            compliance_notes=list(template.compliance_notes)
+        )
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """语义缓存命中率"""
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total else 0.0
+
+    def clear_cache(self):
+        """清空语义缓存与预览缓存"""
+        self._semantic_cache.clear()
+        self._preview_cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _context_seed(self, context: OutreachContext) -> int:
+        """deterministic 模式的随机种子"""
+        if self.seed is not None:
+            return self.seed
+        return _stable_seed(context.influencer_name, context.brand_name, context.product_name)
+
+    def _generate_with_tone(self, tone: ToneMode, context: OutreachContext, rng=None) -> GeneratedOutreach:
+        """按指定语气生成（不修改 self.tone，可并发调用）"""
+        rng = rng or self._rng
+
         # 1. 生成主题
-        subject = self._build_subject(context)
+        subject = self._build_subject(context, tone, rng)
 
         # 2. 生成正文
-        body = self._build_body(context)
+        body = self._build_body(context, tone, rng)
 
         # 3. 添加GDPR合规内容
         compliance_notes = []
         if self.include_gdpr:
-            body, compliance_notes = self._add_gdpr_compliance(body, context)
+            body, compliance_notes = self._add_gdpr_compliance(body, context, tone)
 
         return GeneratedOutreach(
             subject=subject,
             body=body,
-            tone_mode=self.tone.value,
+            tone_mode=tone.value,
             gdpr_compliant=self.include_gdpr,
             compliance_notes=compliance_notes
         )
@@ -366,11 +520,52 @@ class OutreachGenerator:
             # 降级到模板生成
             return self.generate(context)
 
+        messages = self._build_llm_messages(context, custom_prompt)
+
+        # 调用LLM（这里是接口预留，实际需要实现）
+        # response = self.llm_client.chat(messages)
+
+        # 暂时返回模板生成结果
+        return self.generate(context)
+
+    def generate_with_llm_batch(self, contexts: List[OutreachContext]) -> List[GeneratedOutreach]:
+        """
+        批量生成（多个红人）
+
+        LLM调用尚未接入，目前与 generate_with_llm 一样降级为逐条模板生成
+        """
+        return [self.generate(context) for context in contexts]
+
+    def _build_llm_messages(self, context: OutreachContext, custom_prompt: str = None) -> List[dict]:
+        """
+        构建LLM消息
+
+        顺序固定为 [稳定的系统提示] -> [每个红人不同的用户提示]，系统提示只依赖语气，
+        标记 cache_control 后支持前缀缓存的服务端（Anthropic / Bedrock 等）可复用已预填充的前缀
+        """
+        return [
+            {
+                "role": "system",
+                "content": [{
+                    "type": "text",
+                    "text": self._system_prompt(self.tone),
+                    "cache_control": {"type": "ephemeral"}
+                }]
+            },
+            {"role": "user", "content": self._user_prompt(context, custom_prompt)}
+        ]
+
+    def _system_prompt(self, tone: ToneMode) -> str:
+        """系统提示（按语气缓存，跨请求保持逐字节一致）"""
+        cached = self._system_prompt_by_tone.get(tone)
+        if cached is not None:
+            return cached
+
         # 构建RAG Prompt
-        tone_desc = "严谨商务风格" if self.tone == ToneMode.FORMAL else "社交媒体亲和风格"
+        tone_desc = "严谨商务风格" if tone == ToneMode.FORMAL else "社交媒体亲和风格"
 
         # 检索相关俚语作为上下文
-        retrieved_phrases = self._retrieve_relevant_phrases(context)
+        retrieved_phrases = self._retrieve_relevant_phrases(tone=tone)
 
         system_prompt = f"""你是一位专业的德语商务文案撰写专家，专门为跨境电商品牌撰写红人开发信。
 
@@ -390,6 +585,11 @@ class OutreachGenerator:
 - 个性化提及红人的内容
 - 清晰说明合作价值"""
 
+        self._system_prompt_by_tone[tone] = system_prompt
+        return system_prompt
+
+    def _user_prompt(self, context: OutreachContext, custom_prompt: str = None) -> str:
+        """用户提示（每个红人不同）"""
         user_prompt = f"""请为以下场景生成一封德语开发信：
 
 红人信息：
@@ -412,16 +612,16 @@ class OutreachGenerator:
         if custom_prompt:
             user_prompt += f"\n\n额外要求：{custom_prompt}"
 
-        # 调用LLM（这里是接口预留，实际需要实现）
-        # response = self.llm_client.chat(system_prompt, user_prompt)
-
-        # 暂时返回模板生成结果
-        return self.generate(context)
+        return user_prompt
 
-    def _retrieve_relevant_phrases(self, context: OutreachContext) -> str:
-        """检索相关俚语（RAG检索逻辑）"""
-        tone_key = self.tone.value
+    def _retrieve_relevant_phrases(self, context: OutreachContext = None, tone: ToneMode = None) -> str:
+        """检索相关俚语（RAG检索逻辑，结果只取决于语气，按语气缓存）"""
+        tone = tone or self.tone
+        cached = self._RETRIEVED_CACHE.get(tone)
+        if cached is not None:
+            return cached
 
+        tone_key = tone.value
         phrases = []
         for category, tone_phrases in self._phrases.items():
             if tone_key in tone_phrases:
@@ -429,7 +629,9 @@ class OutreachGenerator:
                 for p in tone_phrases[tone_key][:2]:  # 每类取2个示例
                     phrases.append(f"  - {p}")
 
-        return "\n".join(phrases)
+        result = "\n".join(phrases)
+        self._RETRIEVED_CACHE[tone] = result
+        return result
 
     def _retrieve_influencer_style(self, context: OutreachContext) -> Dict[str, any]:
         """
@@ -451,11 +653,14 @@ class OutreachGenerator:
 
         # 从红人常用语气词推断风格
         if context.tone_keywords:
-            casual_indicators = ["mega", "super", "krass", "geil", "nice", "😍", "🔥"]
-            formal_indicators = ["qualität", "nachhaltig", "empfehlen", "erfahrung"]
-
-            casual_count = sum(1 for k in context.tone_keywords if k.lower() in casual_indicators)
-            formal_count = sum(1 for k in context.tone_keywords if k.lower() in formal_indicators)
+            # 每个词只转一次小写；重复出现的词按次数计
+            casual_count = formal_count = 0
+            for k in context.tone_keywords:
+                k = k.lower()
+                if k in _CASUAL_INDICATORS:
+                    casual_count += 1
+                elif k in _FORMAL_INDICATORS:
+                    formal_count += 1
 
             if casual_count > formal_count:
                 style_analysis["detected_tone"] = "casual"
@@ -478,21 +683,58 @@ class OutreachGenerator:
 
         return style_analysis
 
-    def preview_both_tones(self, context: OutreachContext) -> Dict[str, GeneratedOutreach]:
-        """预览两种语气模式的输出"""
-        results = {}
+    def preview_both_tones(
+        self,
+        context: OutreachContext,
+        deterministic: bool = False
+    ) -> Dict[str, GeneratedOutreach]:
+        """
+        预览两种语气模式的输出
+
+        deterministic 模式下两种语气使用同一种子，结果按上下文缓存
+        """
+        if not deterministic:
+            return {tone.value: self._generate_with_tone(tone, context) for tone in ToneMode}
+
+        seed = self._context_seed(context)
+        key = (repr(context), self.include_gdpr, seed)
+        cached = self._preview_cache.get(key)
+        if cached is not None:
+            self._preview_cache.move_to_end(key)
+            return self._copy_previews(cached)
+
+        results = {
+            tone.value: self._generate_with_tone(tone, context, random.Random(seed))
+            for tone in ToneMode
+        }
+        self._preview_cache[key] = results
+        while len(self._preview_cache) > self.preview_cache_size:
+            self._preview_cache.popitem(last=False)
+        return self._copy_previews(results)
+
+    @staticmethod
+    def _copy_previews(previews: Dict[str, GeneratedOutreach]) -> Dict[str, GeneratedOutreach]:
+        """返回缓存预览的独立副本，调用方修改结果不会污染缓存"""
+        return {
+            tone: replace(outreach, compliance_notes=list(outreach.compliance_notes))
+            for tone, outreach in previews.items()
+        }
+
 
-        original_tone = self.tone
+# ============ 便捷函数 ============
 
-        for tone in ToneMode:
-            self.tone = tone
-            results[tone.value] = self.generate(context)
+# 便捷函数复用的生成器（按语气各一个，保留已预热的缓存）
+# 多线程/free-threading 下需要独立状态的调用方应自行创建 OutreachGenerator
+_GENERATOR_POOL: Dict[ToneMode, OutreachGenerator] = {}
 
-        self.tone = original_tone
-        return results
 
+def _get_generator(tone: ToneMode) -> OutreachGenerator:
+    """获取指定语气的共享生成器"""
+    generator = _GENERATOR_POOL.get(tone)
+    if generator is None:
+        generator = _GENERATOR_POOL[tone] = OutreachGenerator(tone=tone)
+    return generator
 
-# ============ 便捷函数 ============
 
 def generate_outreach(
     influencer_name: str,
@@ -522,14 +764,94 @@ def generate_outreach(
     )
 
     tone_mode = ToneMode.FORMAL if tone == "formal" else ToneMode.FRIENDLY
-    generator = OutreachGenerator(tone=tone_mode)
-
-    return generator.generate(context)
+    return _get_generator(tone_mode).generate(context)
 
 
 # ============ Privacy_Check 函数 (TMG §5 Impressum合规) ============
 
-@dataclass
+# 关键词分组：privacy_check 与 ApologyGenerator.determine_urgency 共用一次扫描
+_KEYWORD_GROUPS = {
+    # 退订选项 (UWG §7)
+    "opt_out": [
+        "keine weiteren nachrichten",
+        "abmelden", "abbestellen",
+        "unsubscribe", "opt-out",
+        "nicht mehr kontaktieren"
+    ],
+    # 数据保护声明 (GDPR Art.13)
+    "data_protection": [
+        "datenschutz", "daten", "privacy",
+        "nicht weitergegeben", "vertraulich"
+    ],
+    # 差评紧急程度
+    "critical": [
+        "anwalt", "rechtsanwalt", "klage", "gericht",
+        "gefährlich", "verletzung", "krankenhaus",
+        "betrug", "täuschung", "polizei"
+    ],
+    "high": [
+        "rückerstattung", "geld zurück", "defekt",
+        "kaputt", "funktioniert nicht", "falsch"
+    ],
+}
+
+
+# 公司形式（按整词匹配，避免 "ag"/"ug" 命中 "magazin"/"ugly" 等普通单词）
+_COMPANY_INDICATORS = frozenset({"gmbh", "ag", "ug", "kg", "ohg", "e.k", "gbr"})
+# 单词切分：字母序列，允许中间带点的缩写（"e.k." -> "e.k"）
+_TOKEN_RE = re.compile(r"[a-zäöüß]+(?:\.[a-zäöüß]+)*")
+
+
+def _build_keyword_automaton():
+    """构建 Aho-Corasick 自动机（需要 pyahocorasick，未安装时返回 None）"""
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+
+    owners: Dict[str, List[str]] = {}
+    for category, keywords in _KEYWORD_GROUPS.items():
+        for kw in keywords:
+            owners.setdefault(kw, []).append(category)
+
+    automaton = ahocorasick.Automaton()
+    for kw, categories in owners.items():
+        automaton.add_word(kw, tuple(categories))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _keyword_categories(text_lower: str, categories: List[str]) -> set:
+    """
+    返回文本中出现了关键词的分组（子串匹配）
+
+    有自动机时一次线性扫描得到全部命中分组；否则逐组回退到子串查找
+    """
+    if _KEYWORD_AUTOMATON is not None:
+        return {cat for _, cats in _KEYWORD_AUTOMATON.iter(text_lower) for cat in cats}
+    return {
+        cat for cat in categories
+        if any(kw in text_lower for kw in _KEYWORD_GROUPS[cat])
+    }
+
+
+# Impressum检查项（位掩码）
+_IMP_COMPANY = 1
+_IMP_ADDRESS = 2
+_IMP_CONTACT = 4
+_IMP_PERSON = 8
+_IMP_ALL = _IMP_COMPANY | _IMP_ADDRESS | _IMP_CONTACT | _IMP_PERSON
+
+# 预编译的Impressum检测正则
+_ADDRESS_RE = re.compile(r'\d{5}\s+[A-Za-zäöüÄÖÜß]+')  # 德国邮编格式
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_PHONE_RE = re.compile(r'[\+]?[(]?[0-9]{1,3}[)]?[-\s\.]?[0-9]{1,4}[-\s\.]?[0-9]{1,4}[-\s\.]?[0-9]{1,9}')
+
+
+@dataclass(slots=True)
 class PrivacyCheckResult:
     """隐私合规检查结果"""
     is_compliant: bool
@@ -573,83 +895,90 @@ def privacy_check(
     Returns:
         PrivacyCheckResult: 合规检查结果
     """
+    # 上下文只取合规检查用到的部分作为缓存键：(公司名小写, 有地址, 有联系方式, 负责人小写)
+    context_key = None
+    if context:
+        context_key = (
+            context.company_name.lower(),
+            bool(context.company_address),
+            bool(context.company_email or context.company_phone),
+            context.sender_name.lower()
+        )
+
+    # 缓存的是不可变的元组，每次返回新的结果对象，调用方修改列表不会污染缓存
+    is_compliant, missing, warnings, impressum_complete, gdpr_present = _privacy_check_cached(
+        email_body, context_key, strict_mode
+    )
+    return PrivacyCheckResult(
+        is_compliant=is_compliant,
+        missing_elements=list(missing),
+        warnings=list(warnings),
+        impressum_complete=impressum_complete,
+        gdpr_elements_present=list(gdpr_present)
+    )
+
+
+@lru_cache(maxsize=1024)
+def _privacy_check_cached(email_body: str, context_key: Optional[tuple], strict_mode: bool) -> tuple:
+    """privacy_check 的实际检查逻辑，同一模板反复检查时直接命中缓存"""
     missing = []
     warnings = []
     gdpr_present = []
+    company_lower, has_address, has_contact, sender_lower = context_key or ("", False, False, "")
 
     body_lower = email_body.lower()
+    hits = _keyword_categories(body_lower, ["opt_out", "data_protection"])
 
     # 1. 检查退订选项 (UWG §7)
-    opt_out_keywords = [
-        "keine weiteren nachrichten",
-        "abmelden", "abbestellen",
-        "unsubscribe", "opt-out",
-        "nicht mehr kontaktieren"
-    ]
-    has_opt_out = any(kw in body_lower for kw in opt_out_keywords)
-    if has_opt_out:
+    if "opt_out" in hits:
         gdpr_present.append("退订选项 (UWG §7)")
     else:
         missing.append("退订选项 (UWG §7要求)")
 
     # 2. 检查数据保护声明 (GDPR Art.13)
-    data_protection_keywords = [
-        "datenschutz", "daten", "privacy",
-        "nicht weitergegeben", "vertraulich"
-    ]
-    has_data_protection = any(kw in body_lower for kw in data_protection_keywords)
-    if has_data_protection:
+    if "data_protection" in hits:
         gdpr_present.append("数据保护声明 (GDPR Art.13)")
     else:
         missing.append("数据保护声明 (GDPR Art.13要求)")
 
-    # 3. 检查Impressum (TMG §5) - 德国法律强制要求
-    impressum_checks = {
-        "company_name": False,
-        "address": False,
-        "contact": False,
-        "responsible_person": False
-    }
+    # 3. 检查Impressum (TMG §5) - 德国法律强制要求（按位记录已满足项）
+    impressum = 0
 
     # 检查公司名称
-    company_indicators = ["gmbh", "ag", "ug", "kg", "ohg", "e.k.", "gbr"]
-    if any(ind in body_lower for ind in company_indicators):
-        impressum_checks["company_name"] = True
-    elif context and context.company_name:
-        if context.company_name.lower() in body_lower:
-            impressum_checks["company_name"] = True
+    if not _COMPANY_INDICATORS.isdisjoint(_TOKEN_RE.findall(body_lower)):
+        impressum |= _IMP_COMPANY
+    elif company_lower and company_lower in body_lower:
+        impressum |= _IMP_COMPANY
+
+    # 邮编/电话都需要数字、邮箱需要 "@"：不满足时直接跳过对应正则
+    has_digits = any(ch.isdigit() for ch in email_body)
 
     # 检查地址（德国地址格式：街道+门牌号，邮编+城市）
-    import re
-    address_pattern = r'\d{5}\s+[A-Za-zäöüÄÖÜß]+'  # 德国邮编格式
-    if re.search(address_pattern, email_body):
-        impressum_checks["address"] = True
-    elif context and context.company_address:
-        impressum_checks["address"] = True
+    if has_digits and _ADDRESS_RE.search(email_body):
+        impressum |= _IMP_ADDRESS
+    elif has_address:
+        impressum |= _IMP_ADDRESS
 
     # 检查联系方式
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    phone_pattern = r'[\+]?[(]?[0-9]{1,3}[)]?[-\s\.]?[0-9]{1,4}[-\s\.]?[0-9]{1,4}[-\s\.]?[0-9]{1,9}'
-    if re.search(email_pattern, email_body) or re.search(phone_pattern, email_body):
-        impressum_checks["contact"] = True
-    elif context and (context.company_email or context.company_phone):
-        impressum_checks["contact"] = True
+    if ("@" in email_body and _EMAIL_RE.search(email_body)) or (has_digits and _PHONE_RE.search(email_body)):
+        impressum |= _IMP_CONTACT
+    elif has_contact:
+        impressum |= _IMP_CONTACT
 
     # 检查负责人
-    if context and context.sender_name:
-        if context.sender_name.lower() in body_lower:
-            impressum_checks["responsible_person"] = True
+    if sender_lower and sender_lower in body_lower:
+        impressum |= _IMP_PERSON
 
     # 评估Impressum完整性
-    impressum_complete = all(impressum_checks.values())
+    impressum_complete = impressum == _IMP_ALL
 
-    if not impressum_checks["company_name"]:
+    if not impressum & _IMP_COMPANY:
         missing.append("公司名称 (TMG §5)")
-    if not impressum_checks["address"] and strict_mode:
+    if not impressum & _IMP_ADDRESS and strict_mode:
         warnings.append("建议添加公司地址 (TMG §5)")
-    if not impressum_checks["contact"] and strict_mode:
+    if not impressum & _IMP_CONTACT and strict_mode:
         warnings.append("建议添加联系方式 (TMG §5)")
-    if not impressum_checks["responsible_person"]:
+    if not impressum & _IMP_PERSON:
         warnings.append("建议添加负责人姓名")
 
     # 4. 额外检查：商业邮件标识
@@ -659,18 +988,25 @@ def privacy_check(
     # 判断整体合规性
     is_compliant = len(missing) == 0
 
-    return PrivacyCheckResult(
-        is_compliant=is_compliant,
-        missing_elements=missing,
-        warnings=warnings,
-        impressum_complete=impressum_complete,
-        gdpr_elements_present=gdpr_present
-    )
+    return is_compliant, tuple(missing), tuple(warnings), impressum_complete, tuple(gdpr_present)
 
 
 # ============ 道歉信生成器 (Webhook触发) ============
 
-@dataclass
+def _compile_template(template: str):
+    """
+    把固定模板编译成渲染函数（导入时一次性完成），调用时不再解析格式串
+
+    模板中的每个占位符成为一个默认为空字符串的关键字参数，多余的参数被忽略
+    """
+    fields = sorted({name for _, name, _, _ in string.Formatter().parse(template) if name})
+    params = "".join(f'{name}="", ' for name in fields)
+    namespace = {}
+    exec(f"def render({params}**_):\n    return f{template!r}", {}, namespace)
+    return namespace["render"]
+
+
+@dataclass(slots=True)
 class ApologyContext:
     """道歉信上下文"""
     customer_name: str
@@ -685,7 +1021,7 @@ class ApologyContext:
     sender_title: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class GeneratedApology:
     """生成的道歉信"""
     subject: str
@@ -705,7 +1041,7 @@ class ApologyGenerator:
     """
 
     # 道歉信模板库
-    APOLOGY_TEMPLATES = {
+    APOLOGY_TEMPLATES = _freeze({
         "critical": {  # 涉及法律/安全风险
             "subject": "Dringende Angelegenheit - Bestellung {order_id}",
             "opening": "Sehr geehrte/r {name},\n\nwir haben Ihre Bewertung mit großer Besorgnis zur Kenntnis genommen und möchten uns aufrichtig für die entstandenen Unannehmlichkeiten entschuldigen.",
@@ -724,10 +1060,16 @@ class ApologyGenerator:
             "body": "\n\n{issue_response}\n\nAls kleines Dankeschön für Ihr Feedback möchten wir Ihnen {compensation} anbieten.",
             "closing": "\n\nWir hoffen, Sie bald wieder als zufriedenen Kunden begrüßen zu dürfen!\n\nHerzliche Grüße,\n{sender}"
         }
+    })
+
+    # 预编译的模板渲染函数：urgency -> section -> render(**fields)
+    _TEMPLATE_FNS = {
+        urgency: {section: _compile_template(text) for section, text in sections.items()}
+        for urgency, sections in APOLOGY_TEMPLATES.items()
     }
 
     # 补偿方案建议
-    COMPENSATION_SUGGESTIONS = {
+    COMPENSATION_SUGGESTIONS = _freeze({
         "critical": [
             "eine vollständige Rückerstattung",
             "einen kostenlosen Ersatz mit Express-Versand",
@@ -743,34 +1085,34 @@ class ApologyGenerator:
             "kostenlosen Versand bei Ihrer nächsten Bestellung",
             "ein kleines Überraschungsgeschenk"
         ]
-    }
+    })
 
     def __init__(self, company_name: str = "", default_contact: str = ""):
         self.company_name = company_name
         self.default_contact = default_contact
+        self._rng = random.Random()
 
     def determine_urgency(self, review_content: str, rating: int) -> str:
         """根据差评内容判断紧急程度"""
-        content_lower = review_content.lower()
-
-        # 关键词检测
-        critical_keywords = [
-            "anwalt", "rechtsanwalt", "klage", "gericht",
-            "gefährlich", "verletzung", "krankenhaus",
-            "betrug", "täuschung", "polizei"
-        ]
-
-        high_keywords = [
-            "rückerstattung", "geld zurück", "defekt",
-            "kaputt", "funktioniert nicht", "falsch"
-        ]
-
-        if any(kw in content_lower for kw in critical_keywords) or rating == 1:
+        # 1星直接判为critical，无需扫描
+        if rating == 1:
             return "critical"
-        elif any(kw in content_lower for kw in high_keywords) or rating == 2:
-            return "high"
+
+        # 关键词检测：命中critical关键词即可提前结束扫描
+        high = rating == 2
+        content_lower = review_content.lower()
+        if _KEYWORD_AUTOMATON is not None:
+            for _, cats in _KEYWORD_AUTOMATON.iter(content_lower):
+                if "critical" in cats:
+                    return "critical"
+                if "high" in cats:
+                    high = True
         else:
-            return "medium"
+            if any(kw in content_lower for kw in _KEYWORD_GROUPS["critical"]):
+                return "critical"
+            high = high or any(kw in content_lower for kw in _KEYWORD_GROUPS["high"])
+
+        return "high" if high else "medium"
 
     def generate(self, context: ApologyContext) -> GeneratedApology:
         """生成道歉信草稿"""
@@ -782,10 +1124,10 @@ class ApologyGenerator:
         )
 
         # 2. 选择模板
-        template = self.APOLOGY_TEMPLATES[urgency]
+        template = self._TEMPLATE_FNS[urgency]
 
         # 3. 生成补偿建议
-        compensation = context.compensation_offer or random.choice(
+        compensation = context.compensation_offer or self._rng.choice(
             self.COMPENSATION_SUGGESTIONS[urgency]
         )
 
@@ -793,32 +1135,35 @@ class ApologyGenerator:
         issue_response = self._generate_issue_response(context, urgency)
 
         # 5. 组装邮件
-        subject = template["subject"].format(
+        subject = template["subject"](
             order_id=context.order_id or "Ihre Bestellung",
             product=context.product_name or "Ihrem Produkt"
         )
 
-        sender_info = f"{context.sender_name or 'Kundenservice'}"
+        sender_lines = [context.sender_name or "Kundenservice"]
         if context.sender_title:
-            sender_info += f"\n{context.sender_title}"
+            sender_lines.append(context.sender_title)
         if context.company_name or self.company_name:
-            sender_info += f"\n{context.company_name or self.company_name}"
-
-        body = template["opening"].format(
-            name=context.customer_name,
-            product=context.product_name or "unserem Produkt"
-        )
-        body += template["body"].format(
-            issue_response=issue_response,
-            compensation=compensation
-        )
-        body += template["closing"].format(
-            contact=self.default_contact or "kundenservice@example.de",
-            sender=sender_info
-        )
-
-        # 6. 添加GDPR合规内容
-        body += "\n\nDatenschutz: Ihre Daten werden vertraulich behandelt."
+            sender_lines.append(context.company_name or self.company_name)
+        sender_info = "\n".join(sender_lines)
+
+        body_parts = [
+            template["opening"](
+                name=context.customer_name,
+                product=context.product_name or "unserem Produkt"
+            ),
+            template["body"](
+                issue_response=issue_response,
+                compensation=compensation
+            ),
+            template["closing"](
+                contact=self.default_contact or "kundenservice@example.de",
+                sender=sender_info
+            ),
+            # 6. 添加GDPR合规内容
+            "\n\nDatenschutz: Ihre Daten werden vertraulich behandelt."
+        ]
+        body = "".join(body_parts)
 
         # 7. 生成后续行动建议
         follow_up = self._generate_follow_up_actions(urgency, context)
@@ -10,6 +10,8 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Any
 from datetime import datetime, timedelta
 from enum import Enum
+from bisect import bisect_right
+from itertools import chain
 import re
 
 
@@ -19,7 +21,7 @@ class Platform(Enum):
     YOUTUBE = "youtube"
 
 
-@dataclass
+@dataclass(slots=True)
 class InfluencerProfile:
     """红人基础数据（从HTML/API解析后的结构化数据）"""
     platform: Platform
@@ -45,7 +47,7 @@ class InfluencerProfile:
     raw_data: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class EvaluationResult:
     """评估结果"""
     username: str
@@ -151,6 +153,90 @@ NICHE_KEYWORDS = {
 }
 
 
+def _build_keyword_automaton():
+    """构建覆盖全部价值观/垂类关键词的 Aho-Corasick 自动机（需要 pyahocorasick，未安装时返回 None）"""
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for kw in _ALL_KEYWORDS:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+_ALL_KEYWORDS = frozenset(
+    kw
+    for table in (GERMAN_VALUE_KEYWORDS, NICHE_KEYWORDS)
+    for config in table.values()
+    for kw in config["de"] + config["en"]
+)
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _build_value_keyword_slots() -> Dict[str, tuple]:
+    """价值观关键词 -> ((配置位置, 类目, 语言, 关键词), ...)，同一关键词可属于多个类目/语言"""
+    slots: Dict[str, list] = {}
+    position = 0
+    for category, config in GERMAN_VALUE_KEYWORDS.items():
+        for lang in ("de", "en"):
+            for kw in config[lang]:
+                slots.setdefault(kw, []).append((position, category, lang, kw))
+                position += 1
+    return {kw: tuple(entries) for kw, entries in slots.items()}
+
+
+_VALUE_KEYWORD_SLOTS = _build_value_keyword_slots()
+
+# 德语内容检测用的常见功能词（整词匹配）
+_GERMAN_INDICATORS = frozenset({"ich", "und", "der", "die", "das", "ist", "für", "mit"})
+_WORD_RE = re.compile(r"[a-zäöüß]+")
+
+# 垂类关键词按整词匹配（避免 "app" 命中 "happy"）；多词/带符号的关键词仍按子串匹配
+_NICHE_PHRASES = frozenset(
+    kw
+    for config in NICHE_KEYWORDS.values()
+    for kw in config["de"] + config["en"]
+    if not _WORD_RE.fullmatch(kw)
+)
+
+
+def _matched_keywords(text_lower: str) -> set:
+    """
+    返回文本中出现的关键词（子串匹配，与 `kw in text` 语义一致）
+
+    有自动机时一次线性扫描；否则逐个关键词回退到子串查找
+    """
+    if _KEYWORD_AUTOMATON is not None:
+        return {kw for _, kw in _KEYWORD_AUTOMATON.iter(text_lower)}
+    return {kw for kw in _ALL_KEYWORDS if kw in text_lower}
+
+
+# 近30天统计窗口（按整天计算，不足31天都算在内）
+_RECENT_WINDOW = timedelta(days=31)
+
+# 各平台理想月发帖数区间（未列出的平台用默认区间）
+_IDEAL_POSTS_PER_MONTH = {Platform.YOUTUBE: (4, 8)}
+_DEFAULT_POSTS_PER_MONTH = (8, 15)
+
+# 各平台正常互动率区间（%）；Instagram 按粉丝量级另行判断
+_NORMAL_ENGAGEMENT = {
+    Platform.TIKTOK: (3.0, 12.0),
+    Platform.YOUTUBE: (2.0, 8.0),
+}
+
+# 评级：综合得分达到第 i 个阈值即升一级（D < C < B < A < S）
+_GRADE_THRESHOLDS = (40, 55, 70, 85)
+_GRADE_LABELS = ("D", "C", "B", "A", "S")
+
+# 批量打分时的状态编码 -> 文案（与单个评估中的判定分支一一对应）
+_ENGAGEMENT_STATUS = ("正常", "偏低（可能僵尸粉）", "异常高（可能刷量）", "略高")
+_FF_STATUS = ("优秀（真实影响力）", "良好", "一般（可能互关）", "可疑（互关党特征）")
+_CL_STATUS = ("正常", "评论偏少", "评论活跃")
+
+
 class InfluencerEvaluator:
     """
     红人评估器
@@ -186,8 +272,18 @@ class InfluencerEvaluator:
             "relevance": 0.35
         }
 
-    def evaluate(self, profile: InfluencerProfile) -> EvaluationResult:
-        """执行完整评估"""
+        # 权重固定后预先绑定到综合得分函数中，评估时不再查字典
+        wa, wb, wc = (self.weights[k] for k in ("activity", "authenticity", "relevance"))
+        self._combine = lambda a, b, c: a * wa + b * wb + c * wc
+
+    def evaluate(self, profile: InfluencerProfile, generate_recommendation: bool = True) -> EvaluationResult:
+        """
+        执行完整评估
+
+        Args:
+            generate_recommendation: 为False时跳过建议文案生成（recommendation 为空字符串），
+                适合只需要分数的批量场景
+        """
 
         # 1. 活跃度评估
         activity_score, activity_details = self._evaluate_activity(profile)
@@ -199,22 +295,42 @@ class InfluencerEvaluator:
         relevance_score, relevance_details, german_fit = self._evaluate_relevance(profile)
 
         # 4. 计算综合得分
-        total_score = (
-            activity_score * self.weights["activity"] +
-            auth_score * self.weights["authenticity"] +
-            relevance_score * self.weights["relevance"]
-        )
+        total_score = self._combine(activity_score, auth_score, relevance_score)
 
         # 5. 评级
         grade = self._calculate_grade(total_score)
 
+        return self._build_result(
+            profile, total_score, grade,
+            activity_score, activity_details,
+            auth_score, auth_details,
+            relevance_score, relevance_details, german_fit,
+            generate_recommendation
+        )
+
+    def _build_result(
+        self,
+        profile: InfluencerProfile,
+        total_score: float,
+        grade: str,
+        activity_score: float,
+        activity_details: dict,
+        auth_score: float,
+        auth_details: dict,
+        relevance_score: float,
+        relevance_details: dict,
+        german_fit: dict,
+        generate_recommendation: bool = True
+    ) -> EvaluationResult:
+        """在各项得分与评级的基础上补充风险标记与建议"""
+
         # 6. 风险标记
         risk_flags = self._identify_risks(profile, auth_details)
 
         # 7. 生成建议
         recommendation = self._generate_recommendation(
             grade, activity_details, auth_details, relevance_details, german_fit
-        )
+        ) if generate_recommendation else ""
 
         return EvaluationResult(
             username=profile.username,
@@ -247,17 +363,15 @@ class InfluencerEvaluator:
         # 1. 发帖频率 (40分)
         if profile.recent_post_dates:
             now = datetime.now()
-            posts_last_30d = sum(
-                1 for d in profile.recent_post_dates
-                if (now - d).days <= 30
-            )
+            # (now - d).days <= 30 等价于 d 晚于 now - 31天：只算一次截止时间，逐条直接比较，
+            # 不再为每条发帖时间创建 timedelta
+            cutoff = now - _RECENT_WINDOW
+            posts_last_30d = sum(1 for d in profile.recent_post_dates if d > cutoff)
+            latest_post = max(profile.recent_post_dates)
 
             # Instagram/TikTok: 理想频率 8-15条/月
             # YouTube: 理想频率 4-8条/月
-            if profile.platform == Platform.YOUTUBE:
-                ideal_min, ideal_max = 4, 8
-            else:
-                ideal_min, ideal_max = 8, 15
+            ideal_min, ideal_max = _IDEAL_POSTS_PER_MONTH.get(profile.platform, _DEFAULT_POSTS_PER_MONTH)
 
             if ideal_min <= posts_last_30d <= ideal_max:
                 freq_score = 40
@@ -273,7 +387,6 @@ class InfluencerEvaluator:
             score += freq_score
 
             # 2. 最近发帖时间 (30分)
-            latest_post = max(profile.recent_post_dates)
             days_since_post = (now - latest_post).days
 
             if days_since_post <= 3:
@@ -331,10 +444,9 @@ class InfluencerEvaluator:
             # TikTok: 3-10% 正常（算法推荐机制不同）
             # YouTube: 2-8% 正常
 
-            if profile.platform == Platform.TIKTOK:
-                normal_min, normal_max = 3.0, 12.0
-            elif profile.platform == Platform.YOUTUBE:
-                normal_min, normal_max = 2.0, 8.0
+            platform_range = _NORMAL_ENGAGEMENT.get(profile.platform)
+            if platform_range is not None:
+                normal_min, normal_max = platform_range
             else:  # Instagram
                 # 粉丝量级影响互动率
                 if profile.followers > 1000000:
@@ -422,29 +534,33 @@ class InfluencerEvaluator:
         score = 0
 
         # 合并所有文本内容
-        all_text = " ".join([
-            profile.bio,
-            " ".join(profile.recent_captions),
-            " ".join(profile.hashtags)
-        ]).lower()
+        all_text = " ".join(chain((profile.bio,), profile.recent_captions, profile.hashtags)).lower()
+
+        # 一次扫描得到全部命中的关键词，后续按配置顺序做集合查找
+        matched = _matched_keywords(all_text)
+        tokens = set(_WORD_RE.findall(all_text))
 
         # 1. 德国市场价值观关键词匹配 (40分)
         german_keywords_found = {}
         german_score = 0
 
-        for category, config in GERMAN_VALUE_KEYWORDS.items():
-            found_de = [kw for kw in config["de"] if kw in all_text]
-            found_en = [kw for kw in config["en"] if kw in all_text]
-
-            if found_de or found_en:
-                german_keywords_found[category] = {
-                    "de": found_de,
-                    "en": found_en,
-                    "weight": config["weight"]
+        # 只遍历命中的关键词；按配置位置排序后，类目与关键词顺序与配置一致
+        for _, category, lang, kw in sorted(
+            slot for kw in matched for slot in _VALUE_KEYWORD_SLOTS.get(kw, ())
+        ):
+            entry = german_keywords_found.get(category)
+            if entry is None:
+                entry = german_keywords_found[category] = {
+                    "de": [],
+                    "en": [],
+                    "weight": GERMAN_VALUE_KEYWORDS[category]["weight"]
                 }
-                # 德语关键词权重更高
-                german_score += len(found_de) * 5 * config["weight"]
-                german_score += len(found_en) * 3 * config["weight"]
+            entry[lang].append(kw)
+
+        for entry in german_keywords_found.values():
+            # 德语关键词权重更高
+            german_score += len(entry["de"]) * 5 * entry["weight"]
+            german_score += len(entry["en"]) * 3 * entry["weight"]
 
         german_score = min(40, german_score)  # 上限40分
         german_fit["keywords_found"] = german_keywords_found
@@ -460,8 +576,9 @@ class InfluencerEvaluator:
         # 2. 垂类匹配 (40分)
         if self.target_niche and self.target_niche in NICHE_KEYWORDS:
             niche_config = NICHE_KEYWORDS[self.target_niche]
-            found_de = [kw for kw in niche_config["de"] if kw in all_text]
-            found_en = [kw for kw in niche_config["en"] if kw in all_text]
+            niche_hits = tokens.union(_NICHE_PHRASES.intersection(matched))
+            found_de = [kw for kw in niche_config["de"] if kw in niche_hits]
+            found_en = [kw for kw in niche_config["en"] if kw in niche_hits]
 
             niche_match_count = len(found_de) + len(found_en)
 
@@ -485,9 +602,8 @@ class InfluencerEvaluator:
             score += 20  # 未指定垂类，给基础分
 
         # 3. 内容语言检测 (20分)
-        # 检测是否有德语内容
-        german_indicators = ["ich", "und", "der", "die", "das", "ist", "für", "mit"]
-        german_word_count = sum(1 for word in german_indicators if f" {word} " in f" {all_text} ")
+        # 检测是否有德语内容（分词一次后做集合交集）
+        german_word_count = len(_GERMAN_INDICATORS.intersection(tokens))
 
         if german_word_count >= 5:
             lang_score = 20
@@ -506,16 +622,7 @@ class InfluencerEvaluator:
 
     def _calculate_grade(self, total_score: float) -> str:
         """评级"""
-        if total_score >= 85:
-            return "S"
-        elif total_score >= 70:
-            return "A"
-        elif total_score >= 55:
-            return "B"
-        elif total_score >= 40:
-            return "C"
-        else:
-            return "D"
+        return _GRADE_LABELS[bisect_right(_GRADE_THRESHOLDS, total_score)]
 
     def _identify_risks(self, profile: InfluencerProfile, auth_details: dict) -> List[str]:
         """识别风险标记"""
@@ -578,12 +685,197 @@ class InfluencerEvaluator:
             details.append("更新频率稳定")
 
         if details:
-            return f"{base}。{'; '.join(details)}。"
+            return "".join((base, "。", "; ".join(details), "。"))
         return base
 
-    def evaluate_batch(self, profiles: List[InfluencerProfile]) -> List[EvaluationResult]:
-        """批量评估"""
-        return [self.evaluate(p) for p in profiles]
+    def evaluate_batch(
+        self,
+        profiles: List[InfluencerProfile],
+        generate_recommendation: bool = True
+    ) -> List[EvaluationResult]:
+        """
+        批量评估
+
+        活跃度/真实性的数值打分按列（每个指标一个数组）向量化计算，
+        结果与逐个调用 evaluate 一致；相关度仍逐个红人做文本匹配
+
+        Args:
+            generate_recommendation: 为False时跳过建议文案生成
+        """
+        if not profiles:
+            return []
+
+        import numpy as np
+
+        activity = self._evaluate_activity_batch(profiles)
+        authenticity = self._evaluate_authenticity_batch(profiles)
+        relevance = [self._evaluate_relevance(p) for p in profiles]
+
+        # 综合得分与评级按列计算
+        n = len(profiles)
+        totals = self._combine(
+            np.fromiter((score for score, _ in activity), dtype=np.float64, count=n),
+            np.fromiter((score for score, _ in authenticity), dtype=np.float64, count=n),
+            np.fromiter((score for score, _, _ in relevance), dtype=np.float64, count=n)
+        )
+        grades = np.asarray(_GRADE_LABELS)[np.searchsorted(_GRADE_THRESHOLDS, totals, side="right")]
+
+        return [
+            self._build_result(profile, total, grade, *act, *auth, *rel, generate_recommendation)
+            for profile, total, grade, act, auth, rel
+            in zip(profiles, totals.tolist(), grades.tolist(), activity, authenticity, relevance)
+        ]
+
+    def score_batch(self, profiles: List[InfluencerProfile]):
+        """
+        只计算综合得分，返回 float64 数组（与逐个 evaluate 的 total_score 一致）
+
+        不构造评估结果、明细字典和建议文案，适合对大批量红人排序或按分数筛选
+        """
+        import numpy as np
+
+        n = len(profiles)
+        if not n:
+            return np.zeros(0, dtype=np.float64)
+
+        relevance = np.fromiter((self._evaluate_relevance(p)[0] for p in profiles), dtype=np.float64, count=n)
+        return self._combine(
+            self._evaluate_activity_batch(profiles, with_details=False).astype(np.float64),
+            self._evaluate_authenticity_batch(profiles, with_details=False).astype(np.float64),
+            relevance
+        )
+
+    def _evaluate_activity_batch(self, profiles: List[InfluencerProfile], with_details: bool = True):
+        """_evaluate_activity 的批量版本，返回 [(score, details), ...]；with_details=False 时只返回得分数组"""
+        import numpy as np
+
+        n = len(profiles)
+        now = datetime.now()
+
+        # 发帖时间是不定长列表：全部拼成一个数组统一计算天数，再按红人分段归约
+        lengths = np.fromiter((len(p.recent_post_dates) for p in profiles), dtype=np.int64, count=n)
+        has_dates = lengths > 0
+        posts_30d = np.zeros(n, dtype=np.int64)
+        days_since = np.zeros(n, dtype=np.int64)
+        if has_dates.any():
+            dates = np.array(
+                [d for p in profiles for d in p.recent_post_dates], dtype="datetime64[us]"
+            )
+            # 向下取整到天，与 timedelta.days 一致
+            days = (np.datetime64(now, "us") - dates) // np.timedelta64(1, "D")
+            starts = (np.cumsum(lengths) - lengths)[has_dates]
+            posts_30d[has_dates] = np.add.reduceat((days <= 30).astype(np.int64), starts)
+            days_since[has_dates] = np.minimum.reduceat(days, starts)
+
+        is_youtube = np.fromiter((p.platform == Platform.YOUTUBE for p in profiles), dtype=bool, count=n)
+        posts_count = np.fromiter((p.posts_count for p in profiles), dtype=np.int64, count=n)
+
+        # 1. 发帖频率 (40分)
+        ideal_min = np.where(is_youtube, 4, 8)
+        ideal_max = np.where(is_youtube, 8, 15)
+        freq_scores = np.select(
+            [(ideal_min <= posts_30d) & (posts_30d <= ideal_max), posts_30d > ideal_max, posts_30d >= ideal_min * 0.5],
+            [40, 35, 25],
+            10
+        )
+
+        # 2. 最近发帖时间 (30分)
+        recency_scores = np.select([days_since <= 3, days_since <= 7, days_since <= 14], [30, 25, 15], 5)
+
+        # 3. 内容产出量 (30分)
+        content_scores = np.select([posts_count >= 100, posts_count >= 50, posts_count >= 20], [30, 25, 15], 10)
+
+        scores = (
+            np.where(has_dates, freq_scores + recency_scores, 20)
+            + np.where(posts_count > 0, content_scores, 0)
+        )
+        if not with_details:
+            return scores
+
+        results = []
+        for i, (dated, score) in enumerate(zip(has_dates.tolist(), scores.tolist())):
+            details = {}
+            if dated:
+                details["posts_last_30d"] = int(posts_30d[i])
+                details["frequency_score"] = int(freq_scores[i])
+                details["days_since_last_post"] = int(days_since[i])
+                details["recency_score"] = int(recency_scores[i])
+            else:
+                details["warning"] = "无发帖时间数据"
+            if posts_count[i] > 0:
+                details["total_posts"] = int(posts_count[i])
+                details["content_score"] = int(content_scores[i])
+            results.append((score, details))
+        return results
+
+    def _evaluate_authenticity_batch(self, profiles: List[InfluencerProfile], with_details: bool = True):
+        """_evaluate_authenticity 的批量版本，返回 [(score, details), ...]；with_details=False 时只返回得分数组"""
+        import numpy as np
+
+        n = len(profiles)
+        followers = np.fromiter((p.followers for p in profiles), dtype=np.float64, count=n)
+        following = np.fromiter((p.following for p in profiles), dtype=np.float64, count=n)
+        likes = np.fromiter((p.avg_likes for p in profiles), dtype=np.float64, count=n)
+        comments = np.fromiter((p.avg_comments for p in profiles), dtype=np.float64, count=n)
+        is_tiktok = np.fromiter((p.platform == Platform.TIKTOK for p in profiles), dtype=bool, count=n)
+        is_youtube = np.fromiter((p.platform == Platform.YOUTUBE for p in profiles), dtype=bool, count=n)
+
+        # 1. 互动率评估 (50分)
+        has_eng = (followers > 0) & (likes > 0)
+        eng_rate = (likes + comments) / np.where(has_eng, followers, 1.0) * 100
+        normal_min = np.select(
+            [is_tiktok, is_youtube, followers > 1000000, followers > 100000], [3.0, 2.0, 0.5, 1.0], 2.0
+        )
+        normal_max = np.select(
+            [is_tiktok, is_youtube, followers > 1000000, followers > 100000], [12.0, 8.0, 3.0, 5.0], 8.0
+        )
+        # 0=正常 1=偏低 2=异常高 3=略高
+        eng_status = np.select(
+            [(normal_min <= eng_rate) & (eng_rate <= normal_max), eng_rate < normal_min, eng_rate > normal_max * 1.5],
+            [0, 1, 2],
+            3
+        )
+        eng_scores = np.array([50, 20, 15, 35])[eng_status]
+
+        # 2. 粉丝/关注比 (30分)
+        has_ff = (followers > 0) & (following > 0)
+        ff_ratio = followers / np.where(has_ff, following, 1.0)
+        ff_status = np.select([ff_ratio >= 10, ff_ratio >= 5, ff_ratio >= 2], [0, 1, 2], 3)
+        ff_scores = np.array([30, 25, 15, 5])[ff_status]
+
+        # 3. 评论/点赞比 (20分)
+        has_cl = (likes > 0) & (comments > 0)
+        cl_ratio = comments / np.where(has_cl, likes, 1.0) * 100
+        cl_status = np.select([(1 <= cl_ratio) & (cl_ratio <= 5), cl_ratio < 1], [0, 1], 2)
+        cl_scores = np.array([20, 10, 15])[cl_status]
+
+        scores = (
+            np.where(has_eng, eng_scores, 25)
+            + np.where(has_ff, ff_scores, 15)
+            + np.where(has_cl, cl_scores, 10)
+        )
+        if not with_details:
+            return scores
+
+        results = []
+        for i, score in enumerate(scores.tolist()):
+            details = {}
+            if has_eng[i]:
+                details["engagement_rate"] = round(float(eng_rate[i]), 2)
+                details["engagement_status"] = _ENGAGEMENT_STATUS[eng_status[i]]
+                details["engagement_score"] = int(eng_scores[i])
+            else:
+                details["warning"] = "缺少互动数据"
+            if has_ff[i]:
+                details["follower_following_ratio"] = round(float(ff_ratio[i]), 2)
+                details["ff_status"] = _FF_STATUS[ff_status[i]]
+                details["ff_score"] = int(ff_scores[i])
+            if has_cl[i]:
+                details["comment_like_ratio"] = round(float(cl_ratio[i]), 2)
+                details["cl_status"] = _CL_STATUS[cl_status[i]]
+                details["cl_score"] = int(cl_scores[i])
+            results.append((score, details))
+        return results
 
     def rank_influencers(self, results: List[EvaluationResult]) -> List[EvaluationResult]:
         """按综合得分排序"""
@@ -5,10 +5,14 @@
 针对电商评论的多维度情感提取
 """
 
+import os
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dataclasses import dataclass, field
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 
 # 维度关键词配置（德语 -> 中文）
@@ -52,7 +56,44 @@ ASPECT_CONFIG = {
 }
 
 
-@dataclass
+# 中文维度名 -> 列下标（批量汇总时的维度矩阵列顺序）
+_ASPECT_ZH = [config["zh"] for config in ASPECT_CONFIG.values()]
+_ASPECT_ZH_INDEX = {zh: i for i, zh in enumerate(_ASPECT_ZH)}
+
+# 关键词索引：关键词 -> 维度（所有实例共用）
+_KEYWORD_TO_ASPECT = {
+    kw.lower(): aspect
+    for aspect, config in ASPECT_CONFIG.items()
+    for kw in config["keywords"]
+}
+# 关键词在配置中的顺序（命中结果按此排序，与逐词扫描的输出顺序一致）
+_KEYWORD_ORDER = {kw: i for i, kw in enumerate(_KEYWORD_TO_ASPECT)}
+
+
+def _build_aspect_automaton():
+    """构建维度关键词的 Aho-Corasick 自动机（需要 pyahocorasick，未安装时返回 None）"""
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for kw in _KEYWORD_TO_ASPECT:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+_ASPECT_AUTOMATON = _build_aspect_automaton()
+
+# 分句用的标点
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+
+# extract_batch 少于该条数时直接串行处理（线程池开销不划算）
+_PARALLEL_MIN_TEXTS = 32
+
+
+@dataclass(slots=True)
 class AspectSentiment:
     """单个维度的情感结果"""
     aspect_de: str
@@ -63,7 +104,7 @@ class AspectSentiment:
     keywords_found: List[str] = field(default_factory=list)
 
 
-@dataclass 
+@dataclass(slots=True)
 class ABSAResult:
     """ABSA完整结果"""
     text: str
@@ -89,12 +130,6 @@ class ABSAExtractor:
     
     def __init__(self, sentiment_analyzer=None):
         self._sentiment_analyzer = sentiment_analyzer
-        
-        # 构建关键词索引
-        self._keyword_to_aspect = {}
-        for aspect, config in ASPECT_CONFIG.items():
-            for kw in config["keywords"]:
-                self._keyword_to_aspect[kw.lower()] = aspect
     
     @property
     def sentiment_analyzer(self):
@@ -106,19 +141,23 @@ class ABSAExtractor:
     
     def _split_sentences(self, text: str) -> List[str]:
         """分句"""
-        sentences = re.split(r'[.!?]+', text)
-        return [s.strip() for s in sentences if s.strip()]
+        return [s for s in (seg.strip() for seg in _SENTENCE_SPLIT_RE.split(text)) if s]
     
     def _find_aspects(self, text: str) -> Dict[str, List[str]]:
-        """查找文本中涉及的维度"""
+        """查找文本中涉及的维度（子串匹配，有自动机时一次扫描）"""
         text_lower = text.lower()
-        aspect_keywords = defaultdict(list)
+        aspect_keywords: Dict[str, List[str]] = {}
         
-        for keyword, aspect in self._keyword_to_aspect.items():
-            if keyword in text_lower:
-                aspect_keywords[aspect].append(keyword)
+        if _ASPECT_AUTOMATON is not None:
+            hits = {kw for _, kw in _ASPECT_AUTOMATON.iter(text_lower)}
+            for keyword in sorted(hits, key=_KEYWORD_ORDER.__getitem__):
+                aspect_keywords.setdefault(_KEYWORD_TO_ASPECT[keyword], []).append(keyword)
+        else:
+            for keyword, aspect in _KEYWORD_TO_ASPECT.items():
+                if keyword in text_lower:
+                    aspect_keywords.setdefault(aspect, []).append(keyword)
         
-        return dict(aspect_keywords)
+        return aspect_keywords
     
     def extract(self, text: str) -> ABSAResult:
         """提取维度情感"""
@@ -137,14 +176,22 @@ class ABSAExtractor:
                 all_aspects[aspect]["sentences"].append(sentence)
                 all_aspects[aspect]["keywords"].update(keywords)
         
-        # 2. 对每个维度分析情感
+        # 2. 对每个维度分析情感（涉及维度的句子去重后一次批量推理）
+        unique_sentences = list(dict.fromkeys(
+            sentence for data in all_aspects.values() for sentence in data["sentences"]
+        ))
+        sentence_results = dict(zip(
+            unique_sentences,
+            self.sentiment_analyzer.analyze_batch(unique_sentences, show_progress=False)
+        )) if unique_sentences else {}
+        
         aspect_results = []
         for aspect, data in all_aspects.items():
             config = ASPECT_CONFIG[aspect]
             
             scores, confidences = [], []
             for sentence in data["sentences"]:
-                result = self.sentiment_analyzer.analyze(sentence)
+                result = sentence_results[sentence]
                 scores.append(result.score)
                 confidences.append(result.confidence)
             
@@ -176,10 +223,41 @@ class ABSAExtractor:
             summary=summary
         )
 
-    def extract_batch(self, texts: List[str]) -> List[ABSAResult]:
-        """批量提取"""
-        from tqdm import tqdm
-        return [self.extract(t) for t in tqdm(texts, desc="ABSA分析")]
+    def extract_batch(
+        self,
+        texts: List[str],
+        max_workers: Optional[int] = None,
+        show_progress: bool = False
+    ) -> List[ABSAResult]:
+        """
+        批量提取（结果顺序与输入一致）
+        
+        多条文本时在线程池中并发提取：模型推理期间 torch 会释放 GIL，
+        线程共享同一个已加载的模型，不需要像多进程那样每个进程各载一份
+        
+        Args:
+            max_workers: 线程数，默认为 CPU 核数（不超过 8）
+            show_progress: 是否显示进度条（短文本批量时进度条本身的开销不可忽略）
+        """
+        if len(texts) < _PARALLEL_MIN_TEXTS:
+            results = map(self.extract, texts)
+            if show_progress:
+                from tqdm import tqdm
+                results = tqdm(results, total=len(texts), desc="ABSA分析")
+            return list(results)
+        
+        # 在主线程中完成懒加载，避免多个线程同时加载模型
+        load_model = getattr(self.sentiment_analyzer, "_load_model", None)
+        if load_model is not None:
+            load_model()
+        
+        workers = max_workers or min(8, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(self.extract, texts)
+            if show_progress:
+                from tqdm import tqdm
+                results = tqdm(results, total=len(texts), desc="ABSA分析")
+            return list(results)
 
     def aggregate(self, results: List[ABSAResult]) -> Dict[str, dict]:
         """汇总多条评论的维度统计"""
@@ -191,11 +269,44 @@ class ABSAExtractor:
 
         summary = {}
         for dim, scores in dim_scores.items():
+            arr = np.asarray(scores, dtype=np.float64)
             summary[dim] = {
-                "avg_score": round(sum(scores) / len(scores), 3),
-                "count": len(scores),
-                "positive_rate": round(sum(1 for s in scores if s > 0.6) / len(scores) * 100, 1)
+                "avg_score": round(float(arr.mean()), 3),
+                "count": arr.size,
+                "positive_rate": round(float((arr > 0.6).mean() * 100), 1)
             }
 
         return dict(sorted(summary.items(), key=lambda x: x[1]["count"], reverse=True))
 
+    @staticmethod
+    def aggregate_summaries(summaries: List[Dict[str, float]]) -> Dict[str, dict]:
+        """
+        汇总多条评论的维度统计（输入为各条结果的 summary: 维度 -> 得分）
+        
+        按 [评论数 x 维度数] 矩阵列式计算，未提及的维度记为 NaN
+        """
+        if not summaries:
+            return {}
+        
+        matrix = np.full((len(summaries), len(_ASPECT_ZH)), np.nan)
+        for i, summary in enumerate(summaries):
+            for dim, score in summary.items():
+                matrix[i, _ASPECT_ZH_INDEX[dim]] = score
+        
+        mentioned = ~np.isnan(matrix)
+        counts = mentioned.sum(axis=0)
+        totals = np.where(mentioned, matrix, 0.0).sum(axis=0)
+        positives = (matrix > 0.6).sum(axis=0)
+        
+        summary = {}
+        for j in np.argsort(-counts, kind="stable"):
+            count = int(counts[j])
+            if count == 0:
+                break
+            summary[_ASPECT_ZH[j]] = {
+                "avg_score": round(float(totals[j]) / count, 3),
+                "count": count,
+                "positive_rate": round(int(positives[j]) / count * 100, 1)
+            }
+        
+        return summary
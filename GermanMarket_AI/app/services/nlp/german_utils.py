@@ -7,7 +7,8 @@
 
 import re
 import unicodedata
-from typing import List, Set
+from functools import lru_cache
+from typing import FrozenSet, List, Set
 
 # 德语特殊字符映射
 UMLAUT_MAP = {
@@ -15,9 +16,11 @@ UMLAUT_MAP = {
     'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue',
     'ß': 'ss'
 }
+# 单次 C 级替换所需的转换表（值可为多字符）
+_UMLAUT_TABLE = str.maketrans(UMLAUT_MAP)
 
 # 德语停用词（扩展版）
-GERMAN_STOPWORDS: Set[str] = {
+GERMAN_STOPWORDS: FrozenSet[str] = frozenset({
     # 冠词
     'der', 'die', 'das', 'den', 'dem', 'des',
     'ein', 'eine', 'einer', 'einem', 'einen', 'eines',
@@ -43,7 +46,7 @@ GERMAN_STOPWORDS: Set[str] = {
     # 其他
     'ja', 'nein', 'vielleicht', 'mehr', 'weniger', 'alle', 'alles',
     'jeder', 'jede', 'jedes', 'dieser', 'diese', 'dieses', 'so', 'als', 'wenn'
-}
+})
 
 # 电商评论常见表达（用于关键词提取增强）
 ECOMMERCE_POSITIVE_WORDS = {
@@ -57,6 +60,44 @@ ECOMMERCE_NEGATIVE_WORDS = {
 }
 
 
+def _build_sentiment_automaton():
+    """构建情感词 Aho-Corasick 自动机（需要 pyahocorasick，未安装时返回 None）"""
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for word in ECOMMERCE_POSITIVE_WORDS | ECOMMERCE_NEGATIVE_WORDS:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+# 固定遍历顺序，命中结果按原集合顺序输出
+_POSITIVE_ORDER = tuple(ECOMMERCE_POSITIVE_WORDS)
+_NEGATIVE_ORDER = tuple(ECOMMERCE_NEGATIVE_WORDS)
+_SENTIMENT_AUTOMATON = _build_sentiment_automaton()
+
+# 预编译正则（预处理热路径，避免每次调用查 re 缓存）
+# 评论清洗合并为一次扫描: HTML / URL / 邮箱 / 多点号 / 非法字符
+_RE_CLEAN = re.compile(
+    r'(?P<html><[^>]+>)'
+    r'|(?P<url>https?://\S+)'
+    r'|(?P<email>\S+@\S+\.\S+)'
+    r'|(?P<dots>\.{2,})'
+    r'|(?P<bad>[^\w\s.,!?äöüÄÖÜß\-\'\"()])'
+)
+_CLEAN_REPL = {'html': '', 'url': '', 'email': '', 'dots': '...', 'bad': ' '}
+_RE_WS = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=16)
+def _token_pattern(min_length: int) -> "re.Pattern":
+    """按最小长度缓存分词正则（有界缓存，不会挤占 re 模块自身的缓存）"""
+    return re.compile(r'\b[a-zA-ZäöüÄÖÜß]{%d,}\b' % min_length)
+
+
 def normalize_german_text(text: str, keep_umlauts: bool = True) -> str:
     """
     德语文本规范化
@@ -73,42 +114,35 @@ def normalize_german_text(text: str, keep_umlauts: bool = True) -> str:
     
     # 可选转换变音符
     if not keep_umlauts:
-        for umlaut, replacement in UMLAUT_MAP.items():
-            text = text.replace(umlaut, replacement)
+        text = text.translate(_UMLAUT_TABLE)
     
     # 移除多余空白
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _RE_WS.sub(' ', text).strip()
     
     return text
 
 
+def _clean_repl(match: "re.Match") -> str:
+    return _CLEAN_REPL[match.lastgroup]
+
+
 def clean_review_text(text: str) -> str:
     """清洗电商评论文本"""
     if not text:
         return ""
     
-    # 移除HTML
-    text = re.sub(r'<[^>]+>', '', text)
-    # 移除URL
-    text = re.sub(r'https?://\S+', '', text)
-    # 移除邮箱
-    text = re.sub(r'\S+@\S+\.\S+', '', text)
-    # 保留德语字符和基本标点
-    text = re.sub(r'[^\w\s.,!?äöüÄÖÜß\-\'\"()]', ' ', text)
-    # 修复多个点号
-    text = re.sub(r'\.{2,}', '...', text)
+    # 移除HTML/URL/邮箱、过滤非德语字符、修复多个点号（单次扫描）
+    text = _RE_CLEAN.sub(_clean_repl, text)
     # 规范空白
-    text = re.sub(r'\s+', ' ', text)
+    text = _RE_WS.sub(' ', text)
     
     return text.strip()
 
 
 def remove_stopwords(tokens: List[str], custom_stopwords: Set[str] = None) -> List[str]:
     """移除停用词"""
-    stopwords = GERMAN_STOPWORDS.copy()
-    if custom_stopwords:
-        stopwords.update(custom_stopwords)
-    return [t for t in tokens if t.lower() not in stopwords and len(t) > 1]
+    stopwords = GERMAN_STOPWORDS | custom_stopwords if custom_stopwords else GERMAN_STOPWORDS
+    return [t for t in tokens if len(t) > 1 and t.lower() not in stopwords]
 
 
 def extract_keywords(text: str, min_length: int = 3, max_keywords: int = 20) -> List[str]:
@@ -119,25 +153,32 @@ def extract_keywords(text: str, min_length: int = 3, max_keywords: int = 20) ->
         关键词列表(按出现顺序去重)
     """
     # 分词
-    tokens = re.findall(r'\b[a-zA-ZäöüÄÖÜß]{%d,}\b' % min_length, text)
-    # 移除停用词
-    tokens = remove_stopwords(tokens)
-    # 去重保序
+    pattern = _token_pattern(min_length)
+    # 小写一次，移除停用词并去重保序
     seen = set()
     result = []
-    for token in tokens:
+    for token in pattern.findall(text):
         lower = token.lower()
-        if lower not in seen:
-            seen.add(lower)
-            result.append(lower)
+        if lower in seen or lower in GERMAN_STOPWORDS or len(lower) < 2:
+            continue
+        seen.add(lower)
+        result.append(lower)
+        if len(result) == max_keywords:
+            break
     return result[:max_keywords]
 
 
 def detect_sentiment_words(text: str) -> dict:
     """快速检测情感词"""
     text_lower = text.lower()
-    positive = [w for w in ECOMMERCE_POSITIVE_WORDS if w in text_lower]
-    negative = [w for w in ECOMMERCE_NEGATIVE_WORDS if w in text_lower]
+    if _SENTIMENT_AUTOMATON is not None:
+        # 一次线性扫描找出全部命中（子串语义，与 `w in text_lower` 一致）
+        hits = {w for _, w in _SENTIMENT_AUTOMATON.iter(text_lower)}
+        positive = [w for w in _POSITIVE_ORDER if w in hits]
+        negative = [w for w in _NEGATIVE_ORDER if w in hits]
+    else:
+        positive = [w for w in _POSITIVE_ORDER if w in text_lower]
+        negative = [w for w in _NEGATIVE_ORDER if w in text_lower]
     return {
         "positive_words": positive,
         "negative_words": negative,
@@ -5,12 +5,16 @@
 基于BERT的情感分析，支持单条和批量处理
 """
 
+import numpy as np
 import torch
+from pathlib import Path
 from typing import List, Optional
 from dataclasses import dataclass
 from enum import Enum
 
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from ..cache import LRUCache, text_digest
 
 
 class SentimentLabel(Enum):
@@ -20,6 +24,13 @@ class SentimentLabel(Enum):
     UNCERTAIN = "uncertain"
 
 
+# 标签 -> 整数编码（统计时按列计数）
+_LABEL_CODES = {label: i for i, label in enumerate(SentimentLabel)}
+
+# 情感词快速判定时给出的置信度
+_LEXICAL_CONFIDENCE = 0.9
+
+
 @dataclass
 class SentimentResult:
     """情感分析结果"""
@@ -46,36 +57,165 @@ class GermanSentimentAnalyzer:
         model_name: str = "oliverguhr/german-sentiment-bert",
         device: str = "auto",
         threshold_positive: float = 0.6,
-        threshold_negative: float = 0.4
+        threshold_negative: float = 0.4,
+        quantized: bool = False,
+        onnx_providers: Optional[List[str]] = None,
+        cache_dir: Optional[str] = None,
+        cache_size: int = 100_000,
+        disk_cache_dir: Optional[str] = None,
+        lexical_min_words: int = 0
     ):
+        """
+        Args:
+            quantized: CPU推理时使用INT8动态量化模型（优先ONNX，需安装 optimum[onnxruntime]；否则用PyTorch动态量化）
+            onnx_providers: ONNX Runtime执行器优先级列表
+            cache_dir: 量化模型缓存目录
+            cache_size: 按清洗后文本缓存模型输出的条数，0表示不缓存
+            disk_cache_dir: 模型输出的磁盘缓存目录，跨进程/重启复用（需安装 diskcache），None表示不启用
+            lexical_min_words: 只含一种倾向的情感词且不少于该数量时跳过模型直接判定，0表示不启用
+        """
         self.model_name = model_name
         self.device = "cuda" if device == "auto" and torch.cuda.is_available() else "cpu"
         self.threshold_positive = threshold_positive
         self.threshold_negative = threshold_negative
+        self.quantized = quantized
+        self.onnx_providers = onnx_providers or ["CPUExecutionProvider"]
+        self.cache_dir = Path(cache_dir) if cache_dir else Path("cache") / "models"
+        
+        # 同一句子（多个维度共用的句子、单句评论的整体与分句）只推理一次
+        self._cache = LRUCache(cache_size) if cache_size > 0 else None
+        self._disk_cache = self._open_disk_cache(disk_cache_dir) if disk_cache_dir else None
+        # 磁盘缓存可能被多个模型/量化配置共用，键里带上模型标识
+        self._disk_namespace = f"{model_name}{'-int8' if quantized else ''}"
+        
+        self.lexical_min_words = lexical_min_words
+        self.lexical_hits = 0  # 跳过模型的次数
         
         # 懒加载
-        self._pipeline = None
+        self._tokenizer = None
+        self._model = None
+        self._id2label = None
     
     def _load_model(self):
         """懒加载模型"""
-        if self._pipeline is not None:
+        if self._model is not None:
             return
         
         print(f"加载模型: {self.model_name} -> {self.device}")
         
         tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
         
-        self._pipeline = pipeline(
-            "sentiment-analysis",
-            model=model,
-            tokenizer=tokenizer,
-            device=0 if self.device == "cuda" else -1,
-            max_length=512,
-            truncation=True
-        )
+        # INT8量化只用于CPU推理，GPU上保持原始模型
+        model = self._load_onnx_int8() if self.quantized and self.device == "cpu" else None
+        if model is None:
+            if self.device == "cuda":
+                # GPU上直接以FP16加载（不先在内存中构造FP32权重），显存和带宽减半
+                model = AutoModelForSequenceClassification.from_pretrained(self.model_name, torch_dtype=torch.float16)
+                torch.set_float32_matmul_precision("high")  # 残留的FP32矩阵乘允许走TF32
+            else:
+                model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            if self.device == "cpu" and self.quantized:
+                # 无 ONNX Runtime 时退回 PyTorch 动态量化（Linear 层权重INT8）
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            model = model.to(self.device).eval()
+        
+        # 不经 transformers.pipeline，直接调用分词器和模型（省去每次调用的预处理/后处理分发开销）
+        self._tokenizer = tokenizer
+        self._id2label = model.config.id2label
+        self._model = model
         print("✓ 模型加载完成")
 
+    def _predict(self, texts: List[str]) -> List[dict]:
+        """
+        一次前向推理一组文本
+
+        Returns:
+            与 sentiment-analysis pipeline 同格式的输出: [{"label": ..., "score": ...}, ...]
+        """
+        inputs = self._tokenizer(texts, padding=True, truncation=True, max_length=512, return_tensors="pt")
+        inputs = inputs.to(self.device)
+        with torch.inference_mode():
+            logits = self._model(**inputs).logits
+            scores, label_ids = torch.softmax(logits.float(), dim=-1).max(dim=-1)
+        return [
+            {"label": self._id2label[label_id], "score": score}
+            for label_id, score in zip(label_ids.tolist(), scores.tolist())
+        ]
+
+    def _load_onnx_int8(self):
+        """加载INT8动态量化的ONNX模型（首次使用时导出并量化，缓存到磁盘）"""
+        try:
+            import onnxruntime
+            from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        except ImportError:
+            print("⚠️ 未安装 optimum[onnxruntime]，使用PyTorch动态量化")
+            return None
+        
+        onnx_dir = self.cache_dir / "onnx" / (self.model_name.replace("/", "__") + "-int8")
+        quantized_file = "model_quantized.onnx"
+        
+        if not (onnx_dir / quantized_file).exists():
+            print("导出并量化ONNX模型（仅首次）...")
+            ort_model = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+            ort_model.save_pretrained(onnx_dir)
+            quantizer = ORTQuantizer.from_pretrained(ort_model)
+            quantizer.quantize(
+                save_dir=onnx_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            )
+        
+        available = onnxruntime.get_available_providers()
+        provider = next((p for p in self.onnx_providers if p in available), "CPUExecutionProvider")
+        
+        return ORTModelForSequenceClassification.from_pretrained(
+            onnx_dir, file_name=quantized_file, provider=provider
+        )
+
+    @staticmethod
+    def _open_disk_cache(directory: str):
+        """打开磁盘缓存（需要 diskcache，未安装时返回 None）"""
+        try:
+            import diskcache
+        except ImportError:
+            print("⚠️ 未安装 diskcache，仅使用内存缓存")
+            return None
+        return diskcache.Cache(directory)
+
+    def _cached_output(self, key: bytes) -> Optional[dict]:
+        """先查内存缓存，再查磁盘缓存（磁盘命中时回填内存）"""
+        output = self._cache.get(key) if self._cache is not None else None
+        if output is None and self._disk_cache is not None:
+            output = self._disk_cache.get((self._disk_namespace, key))
+            if output is not None and self._cache is not None:
+                self._cache.set(key, output)
+        return output
+
+    def _store_output(self, key: bytes, output: dict):
+        if self._cache is not None:
+            self._cache.set(key, output)
+        if self._disk_cache is not None:
+            self._disk_cache.set((self._disk_namespace, key), output)
+
+    def _lexical_output(self, cleaned: str) -> Optional[dict]:
+        """
+        情感词信号明确时（只有一种倾向且数量达到阈值）直接给出与pipeline同格式的输出，否则返回 None
+        """
+        if not self.lexical_min_words:
+            return None
+        from .german_utils import detect_sentiment_words
+        
+        hint = detect_sentiment_words(cleaned)
+        positive, negative = len(hint["positive_words"]), len(hint["negative_words"])
+        if positive >= self.lexical_min_words and not negative:
+            label = "positive"
+        elif negative >= self.lexical_min_words and not positive:
+            label = "negative"
+        else:
+            return None
+        self.lexical_hits += 1
+        return {"label": label, "score": _LEXICAL_CONFIDENCE, "source": "lexical"}
+
     def _score_to_label(self, score: float, confidence: float) -> SentimentLabel:
         """将得分转换为标签"""
         if confidence < 0.5:
@@ -90,8 +230,6 @@ class GermanSentimentAnalyzer:
         """分析单条文本"""
         from .german_utils import clean_review_text, normalize_german_text
 
-        self._load_model()
-
         # 预处理
         cleaned = clean_review_text(text)
         cleaned = normalize_german_text(cleaned, keep_umlauts=True)
@@ -104,28 +242,20 @@ class GermanSentimentAnalyzer:
                 confidence=0.0
             )
 
-        try:
-            output = self._pipeline(cleaned)[0]
-            label_str = output['label'].lower()
-            confidence = output['score']
-
-            # 转换为统一得分
-            if label_str == 'positive':
-                score = confidence
-            elif label_str == 'negative':
-                score = 1 - confidence
-            else:
-                score = 0.5
+        output = self._lexical_output(cleaned)
+        if output is not None:
+            return self._to_result(text, output)
 
-            final_label = self._score_to_label(score, confidence)
+        key = text_digest(cleaned)
+        output = self._cached_output(key)
+        if output is not None:
+            return self._to_result(text, output)
 
-            return SentimentResult(
-                text=text,
-                label=final_label,
-                score=score,
-                confidence=confidence,
-                raw_output=output
-            )
+        try:
+            self._load_model()  # 命中缓存时不需要加载模型
+            output = self._predict([cleaned])[0]
+            self._store_output(key, output)
+            return self._to_result(text, output)
         except Exception as e:
             print(f"分析失败: {e}")
             return SentimentResult(
@@ -135,16 +265,94 @@ class GermanSentimentAnalyzer:
                 confidence=0.0
             )
 
-    def analyze_batch(self, texts: List[str], show_progress: bool = True) -> List[SentimentResult]:
-        """批量分析"""
+    def _to_result(self, text: str, output: dict) -> SentimentResult:
+        """把pipeline输出转换为统一结果"""
+        label_str = output['label'].lower()
+        confidence = output['score']
+
+        # 转换为统一得分
+        if label_str == 'positive':
+            score = confidence
+        elif label_str == 'negative':
+            score = 1 - confidence
+        else:
+            score = 0.5
+
+        return SentimentResult(
+            text=text,
+            label=self._score_to_label(score, confidence),
+            score=score,
+            confidence=confidence,
+            raw_output=output
+        )
+
+    def analyze_batch(
+        self,
+        texts: List[str],
+        show_progress: bool = True,
+        batch_size: int = 32
+    ) -> List[SentimentResult]:
+        """
+        批量分析
+
+        待推理文本按长度排序后每 batch_size 条一次前向推理（批内长度相近，padding 浪费少），
+        某一批推理失败时该批回退到逐条分析
+        """
         from tqdm import tqdm
+        from .german_utils import clean_review_text, normalize_german_text
 
+        results: List[Optional[SentimentResult]] = [None] * len(texts)
+
+        # 预处理，清洗后为空的文本直接给出不确定结果（重复评论只清洗一次）
+        groups = {}  # 清洗后文本 -> 输入下标列表（相同句子只查缓存/推理一次）
+        cleaned_of = {}
+        for i, text in enumerate(texts):
+            cleaned = cleaned_of.get(text)
+            if cleaned is None:
+                cleaned = cleaned_of[text] = normalize_german_text(clean_review_text(text), keep_umlauts=True)
+            if cleaned:
+                groups.setdefault(cleaned, []).append(i)
+            else:
+                results[i] = SentimentResult(
+                    text=text,
+                    label=SentimentLabel.UNCERTAIN,
+                    score=0.5,
+                    confidence=0.0
+                )
+
+        # 情感词判定明确或命中缓存的直接复用，其余待推理
+        pending = {}
+        for cleaned, indices in groups.items():
+            output = self._lexical_output(cleaned) or self._cached_output(text_digest(cleaned))
+            if output is None:
+                pending[cleaned] = indices
+                continue
+            for i in indices:
+                results[i] = self._to_result(texts[i], output)
+
+        if not pending:
+            return results
+        # 只有存在未命中缓存的文本时才加载模型（配合磁盘缓存，重跑同一数据集不必加载模型）
         self._load_model()
-        results = []
-        iterator = tqdm(texts, desc="情感分析") if show_progress else texts
 
-        for text in iterator:
-            results.append(self.analyze(text))
+        unique = sorted(pending, key=len)
+        starts = range(0, len(unique), batch_size)
+        iterator = tqdm(starts, desc="情感分析") if show_progress else starts
+
+        for start in iterator:
+            chunk = unique[start:start + batch_size]
+            try:
+                outputs = self._predict(chunk)
+            except Exception as e:
+                print(f"批量分析失败，回退逐条分析: {e}")
+                for cleaned in chunk:
+                    for i in pending[cleaned]:
+                        results[i] = self.analyze(texts[i])
+                continue
+            for cleaned, output in zip(chunk, outputs):
+                self._store_output(text_digest(cleaned), output)
+                for i in pending[cleaned]:
+                    results[i] = self._to_result(texts[i], output)
 
         return results
 
@@ -154,9 +362,12 @@ class GermanSentimentAnalyzer:
             return {}
 
         total = len(results)
-        pos = sum(1 for r in results if r.label == SentimentLabel.POSITIVE)
-        neg = sum(1 for r in results if r.label == SentimentLabel.NEGATIVE)
-        neu = sum(1 for r in results if r.label == SentimentLabel.NEUTRAL)
+        codes = np.fromiter((_LABEL_CODES[r.label] for r in results), dtype=np.int8, count=total)
+        scores = np.fromiter((r.score for r in results), dtype=np.float64, count=total)
+        counts = np.bincount(codes, minlength=len(_LABEL_CODES))
+        pos = int(counts[_LABEL_CODES[SentimentLabel.POSITIVE]])
+        neg = int(counts[_LABEL_CODES[SentimentLabel.NEGATIVE]])
+        neu = int(counts[_LABEL_CODES[SentimentLabel.NEUTRAL]])
 
         return {
             "total": total,
@@ -165,6 +376,6 @@ class GermanSentimentAnalyzer:
             "neutral": neu,
             "positive_rate": round(pos / total * 100, 2),
             "negative_rate": round(neg / total * 100, 2),
-            "avg_score": round(sum(r.score for r in results) / total, 4)
+            "avg_score": round(float(scores.mean()), 4)
         }
 
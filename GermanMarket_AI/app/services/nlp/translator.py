@@ -5,10 +5,21 @@
 支持德语<->中文/英文翻译
 """
 
+import re
 from typing import List, Optional
 from dataclasses import dataclass
 
-from transformers import MarianMTModel, MarianTokenizer
+import torch
+from transformers import AutoTokenizer, MarianMTModel
+
+from ..cache import LRUCache, text_digest
+
+
+# 分句：在句末标点后的空白处切分（标点保留在句内）
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+# 译文拼接符
+_SENTENCE_JOINERS = {"zh": "", "en": " "}
 
 
 @dataclass
@@ -26,12 +37,34 @@ class GermanTranslator:
     def __init__(
         self,
         model_de_zh: str = "Helsinki-NLP/opus-mt-de-zh",
-        model_de_en: str = "Helsinki-NLP/opus-mt-de-en"
+        model_de_en: str = "Helsinki-NLP/opus-mt-de-en",
+        cache_size: int = 100_000,
+        device: str = "auto",
+        batch_size: int = 32,
+        num_beams: Optional[int] = None,
+        compile_model: bool = False
     ):
+        """
+        Args:
+            cache_size: 句子级译文缓存条数，0表示不缓存
+            device: 推理设备 (auto/cpu/cuda)
+            batch_size: 每次前向推理的句子数
+            num_beams: 束搜索宽度，1为贪心解码（最快），None沿用模型自带的生成配置
+            compile_model: GPU上用 torch.compile 编译解码器前向
+        """
         self.model_names = {
             "de-zh": model_de_zh,
             "de-en": model_de_en
         }
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = device
+        self.batch_size = batch_size
+        self.num_beams = num_beams
+        self.compile_model = compile_model
+        
+        # 评论中大量重复的句子（"Sehr gute Qualität."）只翻译一次
+        self._cache = LRUCache(cache_size) if cache_size > 0 else None
         
         # 懒加载
         self._models = {}
@@ -46,11 +79,94 @@ class GermanTranslator:
         if not model_name:
             raise ValueError(f"不支持的翻译方向: {direction}")
         
-        print(f"加载翻译模型: {model_name}")
-        self._tokenizers[direction] = MarianTokenizer.from_pretrained(model_name)
-        self._models[direction] = MarianMTModel.from_pretrained(model_name)
+        print(f"加载翻译模型: {model_name} -> {self.device}")
+        # 有 Rust 实现的快速分词器时优先使用；Marian 模型只有 SentencePiece 版本，仍返回 MarianTokenizer
+        self._tokenizers[direction] = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        if self.device == "cuda":
+            # GPU上以半精度直接加载；支持BF16的卡（Ampere及以上）用BF16，数值范围与FP32一致
+            dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            model = MarianMTModel.from_pretrained(model_name, torch_dtype=dtype).to(self.device)
+            torch.set_float32_matmul_precision("high")  # 残留的FP32矩阵乘允许走TF32
+            if self.compile_model:
+                # generate 内部逐步调用 forward，只编译 forward；输入长度不定，按动态形状编译
+                model.forward = torch.compile(model.forward, dynamic=True)
+        else:
+            model = MarianMTModel.from_pretrained(model_name).to(self.device)
+        self._models[direction] = model.eval()
         print(f"✓ {direction} 模型加载完成")
     
+    def _generate(self, direction: str, sentences: List[str], show_progress: bool = False) -> List[str]:
+        """
+        批量翻译一组句子
+
+        按长度排序后每 batch_size 句一批，批内只 padding 到相近长度，结果按原顺序返回
+        """
+        self._load_model(direction)
+        
+        tokenizer = self._tokenizers[direction]
+        model = self._models[direction]
+        
+        order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]))
+        results: List[Optional[str]] = [None] * len(sentences)
+        
+        gen_kwargs = {"max_length": 512, "do_sample": False}
+        if self.num_beams is not None:
+            gen_kwargs["num_beams"] = self.num_beams
+        
+        starts = range(0, len(order), self.batch_size)
+        if show_progress:
+            from tqdm import tqdm
+            starts = tqdm(starts, desc=f"翻译 {direction}")
+        
+        for start in starts:
+            chunk = order[start:start + self.batch_size]
+            
+            # 编码
+            inputs = tokenizer(
+                [sentences[i] for i in chunk],
+                return_tensors="pt", padding=True, truncation=True, max_length=512
+            )
+            if self.device == "cuda":
+                # 锁页内存 + 异步拷贝，H2D传输与前一批的计算重叠
+                inputs = {k: v.pin_memory().to(self.device, non_blocking=True) for k, v in inputs.items()}
+            else:
+                inputs = inputs.to(self.device)
+            
+            # 翻译
+            with torch.inference_mode():
+                outputs = model.generate(**inputs, **gen_kwargs)
+            
+            # 解码
+            for i, target in zip(chunk, tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                results[i] = target
+        
+        return results
+    
+    def _translate_sentences(
+        self,
+        direction: str,
+        sentences: List[str],
+        show_progress: bool = False
+    ) -> List[str]:
+        """逐句查缓存，未命中的句子去重合并后批量翻译（不缓存时同样只翻译一次重复句子）"""
+        if self._cache is None:
+            keys = None
+            results: List[Optional[str]] = [None] * len(sentences)
+        else:
+            keys = [(direction, text_digest(s)) for s in sentences]
+            results = [self._cache.get(key) for key in keys]
+        
+        missing = list(dict.fromkeys(s for s, r in zip(sentences, results) if r is None))
+        if missing:
+            translated = dict(zip(missing, self._generate(direction, missing, show_progress)))
+            for i, sentence in enumerate(sentences):
+                if results[i] is None:
+                    results[i] = translated[sentence]
+                    if keys is not None:
+                        self._cache.set(keys[i], results[i])
+        
+        return results
+    
     def translate(
         self,
         text: str,
@@ -58,7 +174,7 @@ class GermanTranslator:
         source_lang: str = "de"
     ) -> TranslationResult:
         """
-        翻译单条文本
+        翻译单条文本（按句翻译并缓存）
         
         Args:
             text: 德语文本
@@ -66,23 +182,13 @@ class GermanTranslator:
             source_lang: 源语言 (默认de)
         """
         direction = f"{source_lang}-{target_lang}"
-        self._load_model(direction)
-        
-        tokenizer = self._tokenizers[direction]
-        model = self._models[direction]
-        
-        # 编码
-        inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-        
-        # 翻译
-        outputs = model.generate(**inputs, max_length=512)
         
-        # 解码
-        translated = tokenizer.decode(outputs[0], skip_special_tokens=True)
+        sentences = [s for s in _SENTENCE_SPLIT_RE.split(text.strip()) if s]
+        translated = self._translate_sentences(direction, sentences) if sentences else []
         
         return TranslationResult(
             source=text,
-            target=translated,
+            target=_SENTENCE_JOINERS.get(target_lang, " ").join(translated),
             source_lang=source_lang,
             target_lang=target_lang
         )
@@ -90,14 +196,32 @@ class GermanTranslator:
     def translate_batch(
         self,
         texts: List[str],
-        target_lang: str = "zh"
+        target_lang: str = "zh",
+        show_progress: bool = True
     ) -> List[TranslationResult]:
-        """批量翻译"""
-        from tqdm import tqdm
-        return [
-            self.translate(t, target_lang=target_lang) 
-            for t in tqdm(texts, desc=f"翻译->{ target_lang}")
-        ]
+        """
+        批量翻译
+
+        所有文本的句子合并去重后统一按长度分批翻译，再按原文拼回
+        """
+        direction = f"de-{target_lang}"
+        joiner = _SENTENCE_JOINERS.get(target_lang, " ")
+        
+        split = [[s for s in _SENTENCE_SPLIT_RE.split(t.strip()) if s] for t in texts]
+        flat = [s for sentences in split for s in sentences]
+        translated = self._translate_sentences(direction, flat, show_progress) if flat else []
+        
+        results = []
+        pos = 0
+        for text, sentences in zip(texts, split):
+            results.append(TranslationResult(
+                source=text,
+                target=joiner.join(translated[pos:pos + len(sentences)]),
+                source_lang="de",
+                target_lang=target_lang
+            ))
+            pos += len(sentences)
+        return results
     
     def de_to_zh(self, text: str) -> str:
         """德语转中文（便捷方法）"""
@@ -5,12 +5,19 @@
 整合NLP能力，提供完整的评论分析流程
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from typing import List, Dict, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
 
+import numpy as np
+
+from .cache import LRUCache, text_digest
 from .nlp import (
     GermanSentimentAnalyzer,
+    SentimentLabel,
     ABSAExtractor,
     GermanTranslator,
     extract_keywords,
@@ -18,6 +25,19 @@ from .nlp import (
 )
 
 
+# 情感标签 <-> 整数编码（批量统计用）
+_SENTIMENT_LABELS = [label.value for label in SentimentLabel]
+_SENTIMENT_CODES = {label: i for i, label in enumerate(_SENTIMENT_LABELS)}
+
+# 少于该条数时规则特征在当前进程计算（进程池启动和序列化的开销更大）
+_PROCESS_MIN_TEXTS = 1000
+
+
+def _text_features(text: str) -> tuple:
+    """纯文本规则特征：(关键词, 情感词检测)，模块级函数以便在子进程中执行"""
+    return extract_keywords(text), detect_sentiment_words(text)
+
+
 @dataclass
 class ReviewInsight:
     """单条评论的完整分析结果"""
@@ -80,12 +100,31 @@ class ReviewAnalyzer:
     ```
     """
     
-    def __init__(self, translate: bool = True):
+    def __init__(
+        self,
+        translate: bool = True,
+        cache_size: int = 50_000,
+        cache_ttl: Optional[float] = 86400,
+        sentiment_kwargs: Optional[dict] = None,
+        translator_kwargs: Optional[dict] = None,
+        preprocess_workers: int = 0
+    ):
         """
         Args:
             translate: 是否启用翻译功能
+            cache_size: 结果缓存条数（按文本内容哈希），0表示不缓存
+            cache_ttl: 缓存过期时间（秒）
+            sentiment_kwargs: 传给 GermanSentimentAnalyzer 的参数（模型、量化等）
+            translator_kwargs: 传给 GermanTranslator 的参数（模型、设备等）
+            preprocess_workers: 大批量时计算关键词/情感词的进程数，0表示在当前进程计算，-1表示CPU核数
         """
         self.translate = translate
+        self.sentiment_kwargs = sentiment_kwargs or {}
+        self.translator_kwargs = translator_kwargs or {}
+        self.preprocess_workers = (os.cpu_count() or 1) if preprocess_workers < 0 else preprocess_workers
+        
+        # 重复评论直接复用分析结果
+        self._cache = LRUCache(cache_size, ttl=cache_ttl) if cache_size > 0 else None
         
         # 懒加载
         self._sentiment = None
@@ -95,7 +134,7 @@ class ReviewAnalyzer:
     @property
     def sentiment_analyzer(self):
         if self._sentiment is None:
-            self._sentiment = GermanSentimentAnalyzer()
+            self._sentiment = GermanSentimentAnalyzer(**self.sentiment_kwargs)
         return self._sentiment
     
     @property
@@ -107,11 +146,42 @@ class ReviewAnalyzer:
     @property
     def translator(self):
         if self._translator is None and self.translate:
-            self._translator = GermanTranslator()
+            self._translator = GermanTranslator(**self.translator_kwargs)
         return self._translator
     
+    def warmup(self):
+        """
+        预加载全部模型（只加载权重，不做推理）
+        
+        情感模型与翻译模型在线程中并发加载（权重读取和反序列化大多不持有 GIL）；
+        已加载的模型常驻内存，重复调用直接返回。
+        多进程部署时可在 fork 前调用，各 worker 通过写时复制共享模型内存
+        """
+        loaders = [self.sentiment_analyzer._load_model]
+        if self.translate and self.translator:
+            loaders.append(partial(self.translator._load_model, "de-zh"))
+        
+        if len(loaders) == 1:
+            loaders[0]()
+            return
+        with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+            for future in [executor.submit(load) for load in loaders]:
+                future.result()
+    
     def analyze_single(self, text: str) -> ReviewInsight:
-        """分析单条评论"""
+        """分析单条评论（命中缓存时直接返回）"""
+        if self._cache is None:
+            return self._analyze(text)
+        
+        key = text_digest(text)
+        insight = self._cache.get(key)
+        if insight is None:
+            insight = self._analyze(text)
+            self._cache.set(key, insight)
+        return insight
+    
+    def _analyze(self, text: str) -> ReviewInsight:
+        """完整分析流程"""
         
         # 1. 情感分析
         sentiment_result = self.sentiment_analyzer.analyze(text)
@@ -119,20 +189,53 @@ class ReviewAnalyzer:
         # 2. 维度分析
         absa_result = self.absa_extractor.extract(text)
         
-        # 3. 关键词
-        keywords = extract_keywords(text)
+        # 3. 翻译
+        translated = self._translate_text(text) if self.translate and self.translator else ""
         
-        # 4. 情感词检测
-        sentiment_words = detect_sentiment_words(text)
+        return self._build_insight(text, sentiment_result, absa_result, translated, _text_features(text))
+    
+    def _analyze_unique(self, texts: List[str], show_progress: bool = False) -> List[ReviewInsight]:
+        """批量分析一组互不重复的评论：情感、维度、翻译各做一次批量推理"""
+        features = self._text_features_many(texts)
+        sentiment_results = self.sentiment_analyzer.analyze_batch(texts, show_progress=show_progress)
+        absa_results = self.absa_extractor.extract_batch(texts, show_progress=show_progress)
         
-        # 5. 翻译
-        translated = ""
-        if self.translate and self.translator:
+        if not (self.translate and self.translator):
+            translations = [""] * len(texts)
+        else:
             try:
-                translated = self.translator.de_to_zh(text)
+                translations = [
+                    r.target for r in self.translator.translate_batch(texts, target_lang="zh", show_progress=show_progress)
+                ]
             except Exception as e:
-                print(f"翻译失败: {e}")
-                translated = "[翻译失败]"
+                print(f"批量翻译失败，回退逐条翻译: {e}")
+                translations = [self._translate_text(text) for text in texts]
+        
+        return [
+            self._build_insight(*fields)
+            for fields in zip(texts, sentiment_results, absa_results, translations, features)
+        ]
+    
+    def _text_features_many(self, texts: List[str]) -> List[tuple]:
+        """批量计算规则特征；纯 Python 的 CPU 计算受 GIL 限制，大批量时放到进程池"""
+        if self.preprocess_workers <= 1 or len(texts) < _PROCESS_MIN_TEXTS:
+            return [_text_features(text) for text in texts]
+        
+        chunksize = max(1, len(texts) // (self.preprocess_workers * 4))
+        with ProcessPoolExecutor(max_workers=self.preprocess_workers) as executor:
+            return list(executor.map(_text_features, texts, chunksize=chunksize))
+    
+    def _translate_text(self, text: str) -> str:
+        try:
+            return self.translator.de_to_zh(text)
+        except Exception as e:
+            print(f"翻译失败: {e}")
+            return "[翻译失败]"
+    
+    @staticmethod
+    def _build_insight(text: str, sentiment_result, absa_result, translated: str, features: tuple) -> ReviewInsight:
+        """组装单条结果（features 为 _text_features 的输出）"""
+        keywords, sentiment_words = features
         
         return ReviewInsight(
             original_text=text,
@@ -144,52 +247,109 @@ class ReviewAnalyzer:
             sentiment_words=sentiment_words
         )
     
+    def analyze_many(
+        self,
+        texts: List[str],
+        show_progress: bool = False
+    ) -> List[ReviewInsight]:
+        """
+        批量分析，返回与输入顺序一致的结果（不做汇总）
+        
+        相同评论只分析一次；命中结果缓存的直接复用，其余合并为批量推理
+        """
+        results: List[Optional[ReviewInsight]] = [None] * len(texts)
+        
+        groups: Dict[str, List[int]] = {}  # 原文 -> 输入下标列表
+        for i, text in enumerate(texts):
+            groups.setdefault(text, []).append(i)
+        
+        pending = []
+        for text, indices in groups.items():
+            insight = self._cache.get(text_digest(text)) if self._cache is not None else None
+            if insight is None:
+                pending.append(text)
+                continue
+            for i in indices:
+                results[i] = insight
+        
+        if pending:
+            for text, insight in zip(pending, self._analyze_unique(pending, show_progress)):
+                if self._cache is not None:
+                    self._cache.set(text_digest(text), insight)
+                for i in groups[text]:
+                    results[i] = insight
+        
+        return results
+    
     def analyze_batch(
         self,
         texts: List[str],
-        show_progress: bool = True
+        show_progress: bool = True,
+        include_reviews: bool = True
     ) -> ReviewReport:
-        """批量分析并生成报告"""
-        from tqdm import tqdm
-        from collections import Counter
+        """
+        批量分析并生成报告
         
-        reviews = []
-        all_pos_words = []
-        all_neg_words = []
+        Args:
+            include_reviews: 报告中是否附带单条结果（只需汇总时设为 False，报告不再持有全部结果）
+        """
+        analyzed_at = datetime.now()
+        return self.summarize(
+            self.analyze_many(texts, show_progress=show_progress), analyzed_at, include_reviews=include_reviews
+        )
+    
+    def summarize(
+        self,
+        reviews: List[ReviewInsight],
+        analyzed_at: Optional[datetime] = None,
+        include_reviews: bool = True
+    ) -> ReviewReport:
+        """
+        汇总单条结果生成报告
+        
+        可以分块调用 analyze_many 后一次性汇总（见 /analyze/batch 路由）
         
-        iterator = tqdm(texts, desc="分析评论") if show_progress else texts
+        Args:
+            analyzed_at: 分析开始时间（整批只取一次），默认为汇总时刻
+            include_reviews: 报告中是否附带单条结果
+        """
+        from collections import Counter
         
-        for text in iterator:
-            insight = self.analyze_single(text)
-            reviews.append(insight)
-            all_pos_words.extend(insight.sentiment_words.get("positive_words", []))
-            all_neg_words.extend(insight.sentiment_words.get("negative_words", []))
+        # 情感词直接累加计数，不再先拼接成大列表
+        pos_counter = Counter()
+        neg_counter = Counter()
+        for insight in reviews:
+            pos_counter.update(insight.sentiment_words.get("positive_words", ()))
+            neg_counter.update(insight.sentiment_words.get("negative_words", ()))
 
-        # 统计情感分布
-        sentiment_dist = Counter(r.sentiment for r in reviews)
-        avg_score = sum(r.sentiment_score for r in reviews) / len(reviews)
+        # 统计情感分布（得分、标签编码按列存放，一次性计算）
+        n = len(reviews)
+        scores = np.fromiter((r.sentiment_score for r in reviews), dtype=np.float64, count=n)
+        codes = np.fromiter((_SENTIMENT_CODES[r.sentiment] for r in reviews), dtype=np.int8, count=n)
+        counts = np.bincount(codes, minlength=len(_SENTIMENT_LABELS)).tolist()
+        sentiment_dist = {label: c for label, c in zip(_SENTIMENT_LABELS, counts) if c}
+        avg_score = float(scores.mean()) if n else 0.0
 
-        # 汇总维度得分
-        all_absa = [self.absa_extractor.extract(t) for t in texts]
-        dimension_scores = self.absa_extractor.aggregate(all_absa)
+        # 汇总维度得分（复用单条结果中的维度得分，无需重新提取，也无需创建提取器）
+        dimension_scores = ABSAExtractor.aggregate_summaries([r.aspects for r in reviews])
 
         # 关键词统计
-        top_pos = [w for w, _ in Counter(all_pos_words).most_common(10)]
-        top_neg = [w for w, _ in Counter(all_neg_words).most_common(10)]
+        top_pos = [w for w, _ in pos_counter.most_common(10)]
+        top_neg = [w for w, _ in neg_counter.most_common(10)]
 
         # 生成洞察
-        insights = self._generate_insights(sentiment_dist, dimension_scores, len(texts))
+        insights = self._generate_insights(sentiment_dist, dimension_scores, n) if n else []
 
         return ReviewReport(
-            total_reviews=len(texts),
-            analyzed_at=datetime.now(),
-            sentiment_distribution=dict(sentiment_dist),
+            total_reviews=n,
+            analyzed_at=analyzed_at or datetime.now(),
+            sentiment_distribution=sentiment_dist,
             average_score=round(avg_score, 3),
             dimension_scores=dimension_scores,
             top_positive_keywords=top_pos,
             top_negative_keywords=top_neg,
             key_insights=insights,
-            reviews=reviews
+            reviews=reviews if include_reviews else []
         )
 
     def _generate_insights(
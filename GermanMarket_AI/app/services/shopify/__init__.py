@@ -7,12 +7,18 @@ Shopify 数据集成模块
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any, Union
+from typing import IO, List, Dict, Optional, Any, Sequence, Union
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from operator import attrgetter
 import re
 import csv
 import io
+import os
 
 
 class ImportSource(Enum):
@@ -32,13 +38,14 @@ class RiskLevel(Enum):
 
 # ============ 数据 Schema 定义 ============
 
-@dataclass
+@dataclass(slots=True)
 class ReviewSchema:
     """
     评论数据标准 Schema
     
     这是系统内部的统一数据格式，无论从 API 还是 CSV 导入，
     都会转换为此格式进行处理。
+    批量导入时实例数量很大：使用 __slots__，容器字段默认为 None、用到时才创建。
     """
     # 必填字段
     review_id: str                      # 唯一标识
@@ -66,27 +73,38 @@ class ReviewSchema:
     # 分析结果（由系统填充）
     sentiment_score: float = None
     risk_level: RiskLevel = None
-    risk_flags: List[str] = field(default_factory=list)
-    aspects: Dict[str, float] = field(default_factory=dict)
+    risk_flags: Optional[List[str]] = None
+    aspects: Optional[Dict[str, float]] = None
     
     # 元数据
     language: str = "de"
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
+
+    # 内容预览缓存（首次访问 preview 时生成）
+    _preview: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def preview(self) -> str:
+        """截断到 200 字的内容预览"""
+        if self._preview is None:
+            content = self.content
+            self._preview = content[:200] + "..." if len(content) > 200 else content
+        return self._preview
     
     def to_dict(self) -> dict:
         return {
             "review_id": self.review_id,
-            "content": self.content[:200] + "..." if len(self.content) > 200 else self.content,
+            "content": self.preview,
             "rating": self.rating,
             "product_name": self.product_name,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "sentiment_score": self.sentiment_score,
             "risk_level": self.risk_level.value if self.risk_level else None,
-            "risk_flags": self.risk_flags
+            "risk_flags": self.risk_flags or []
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ImportResult:
     """导入结果"""
     success: bool
@@ -97,6 +115,96 @@ class ImportResult:
     reviews: List[ReviewSchema] = field(default_factory=list)
 
 
+# ============ CSV 日期解析 ============
+
+# 支持的日期格式（按顺序尝试）
+_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")
+
+# 上述格式的常规写法一次匹配，直接构造 datetime（不走 strptime 的逐格式尝试和异常）
+_DATE_RE = re.compile(
+    r"(?P<y>[0-9]{4})-(?P<m>[0-9]{1,2})-(?P<d>[0-9]{1,2})"
+    r"(?:\s+(?P<H>[0-9]{1,2}):(?P<M>[0-9]{1,2}):(?P<S>[0-9]{1,2}))?"
+    r"|(?P<d2>[0-9]{1,2})(?P<sep>[./])(?P<m2>[0-9]{1,2})(?P=sep)(?P<y2>[0-9]{4})"
+)
+
+
+def _parse_date(date_str: str) -> Optional[datetime]:
+    """解析 CSV 日期字段，无法解析时返回 None"""
+    match = _DATE_RE.fullmatch(date_str)
+    if match is not None:
+        try:
+            if match["y"]:
+                return datetime(
+                    int(match["y"]), int(match["m"]), int(match["d"]),
+                    int(match["H"] or 0), int(match["M"] or 0), int(match["S"] or 0)
+                )
+            return datetime(int(match["y2"]), int(match["m2"]), int(match["d2"]))
+        except ValueError:
+            return None  # 格式正确但日期非法（如 2024-02-30）
+
+    # 非常规写法（如空格填充的日）交给 strptime 逐个格式尝试
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+# 常见评分写法直接查表，不走 float 解析和异常处理
+_RATING_VALUES = {text: value for value in range(1, 6) for text in (str(value), f"{value}.0")}
+
+
+# ============ CSV 列式读取 ============
+
+# 超过该大小（字符数或字节数）的 CSV 才尝试 pyarrow 解析，小文件建表的开销不划算
+_ARROW_MIN_SIZE = 1 << 20
+
+
+def _read_csv_arrow(
+    csv_content: Union[str, bytes],
+    delimiter: str,
+    header: List[str],
+    column_idx: Dict[str, int],
+    encoding: str = "utf-8"
+):
+    """
+    用 pyarrow 的多线程 C++ 解析器按列读取 CSV，只转换映射到的列（字节输入由 pyarrow 直接解码）
+
+    返回 (按行对齐的元组迭代器, 目标字段 -> 元组下标)；未安装 pyarrow、表头有重名列、
+    没有可用列或解析失败（如列数不齐的行）时返回 None，由调用方回退到 csv 模块
+    """
+    if not column_idx or len(set(header)) != len(header):
+        return None
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        return None
+
+    names = list(dict.fromkeys(header[pos] for pos in column_idx.values()))
+    if isinstance(csv_content, str):
+        csv_content, encoding = csv_content.encode("utf-8"), "utf-8"
+    try:
+        table = pacsv.read_csv(
+            pa.BufferReader(csv_content),
+            read_options=pacsv.ReadOptions(encoding=encoding),
+            parse_options=pacsv.ParseOptions(delimiter=delimiter, newlines_in_values=True),
+            # 全部按字符串读取，空字段保留为 ""，与 csv 模块一致
+            convert_options=pacsv.ConvertOptions(
+                column_types={name: pa.string() for name in names},
+                include_columns=names,
+                strings_can_be_null=False,
+            ),
+        )
+    except pa.ArrowException:
+        return None
+
+    slot = {name: i for i, name in enumerate(names)}
+    columns = [table.column(name).to_pylist() for name in names]
+    return zip(*columns), {field: slot[header[pos]] for field, pos in column_idx.items()}
+
+
 # ============ 高风险关键词配置 ============
 
 # 德语高风险关键词库
@@ -146,6 +254,149 @@ RISK_KEYWORDS = {
 }
 
 
+# 风险等级由低到高；低评分时 LOW/MEDIUM 各提升一级
+_RISK_ORDER = (RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL)
+_RISK_RANK = {level: rank for rank, level in enumerate(_RISK_ORDER)}
+_LOW_RATING_ESCALATION = {RiskLevel.LOW: RiskLevel.MEDIUM, RiskLevel.MEDIUM: RiskLevel.HIGH}
+_HIGH_RISK_LEVELS = frozenset({RiskLevel.CRITICAL, RiskLevel.HIGH})
+
+
+def _build_risk_automaton(keyword_slots: Dict[str, tuple]):
+    """构建覆盖全部风险关键词的 Aho-Corasick 自动机（需要 pyahocorasick，未安装时返回 None）"""
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for kw in keyword_slots:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+def _trie_pattern(words) -> str:
+    """
+    把关键词按公共前缀合并成字典树形式的正则（如 "verletz(?:t|ung)"）
+
+    每个位置按首字母只进入一个分支，不再逐个尝试全部关键词；分支在前、
+    可在此结束的 "?" 为贪婪匹配，因此同一位置命中的仍是最长关键词
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # 关键词在此结束
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if "" in node else group
+
+    return emit(trie)
+
+
+def _build_risk_regex(keyword_slots: Dict[str, tuple]):
+    """
+    无自动机时的回退：全部关键词合成一个预编译正则，在 C 层一次扫描
+
+    零宽前瞻在每个位置取最长命中（字典树正则）；以同一位置开头的其他命中词都是它的前缀，
+    由返回的前缀表补齐，因此结果与逐词 `kw in text` 完全一致
+
+    Returns:
+        (正则, 关键词 -> 它包含的作为前缀的关键词)
+    """
+    pattern = re.compile("(?=(" + _trie_pattern(keyword_slots) + "))")
+    prefixes = {kw: tuple(k for k in keyword_slots if kw.startswith(k)) for kw in keyword_slots}
+    return pattern, prefixes
+
+
+class _KeywordMatcher:
+    """
+    全部类目共用的风险关键词匹配器（构建一次，多个检测器共享）
+
+    有 pyahocorasick 时用一个自动机（共享前缀的 trie + 失败指针）一次线性扫描全部类目；
+    否则用合并后的预编译正则扫描一次
+    """
+
+    __slots__ = ("categories", "slots", "ranks", "automaton", "regex", "prefixes")
+
+    def __init__(self, risk_keywords: Dict[str, dict]):
+        self.categories = tuple(risk_keywords)
+
+        # 关键词 -> ((类目, 配置位置), ...)，同一关键词可属于多个类目（如 "kaputt"）
+        slots: Dict[str, list] = {}
+        for category, config in risk_keywords.items():
+            for position, kw in enumerate(config["keywords"]):
+                slots.setdefault(kw, []).append((category, position))
+        self.slots = {kw: tuple(entries) for kw, entries in slots.items()}
+
+        self.automaton = _build_risk_automaton(self.slots)
+        self.regex, self.prefixes = (None, None) if self.automaton is not None else _build_risk_regex(self.slots)
+
+        # 关键词 -> 所属类目的最高风险等级序号（正则回退时按整组前缀取最高）
+        ranks = {
+            kw: max(_RISK_RANK[risk_keywords[category]["risk_level"]] for category, _ in entries)
+            for kw, entries in self.slots.items()
+        }
+        if self.prefixes is not None:
+            ranks = {kw: max(ranks[p] for p in prefixed) for kw, prefixed in self.prefixes.items()}
+        self.ranks = ranks
+
+    def match(self, text_lower: str) -> Dict[str, List[str]]:
+        """各类目命中的关键词（子串匹配，与 `kw in text` 语义一致，类目内按配置顺序）"""
+        if self.automaton is not None:
+            found = {kw for _, kw in self.automaton.iter(text_lower)}
+        else:
+            found = set()
+            for match in self.regex.finditer(text_lower):
+                found.update(self.prefixes[match.group(1)])
+
+        hits: Dict[str, list] = {}
+        for kw in found:
+            for category, position in self.slots[kw]:
+                hits.setdefault(category, []).append((position, kw))
+        return {
+            category: [kw for _, kw in sorted(hits[category])]
+            for category in self.categories
+            if category in hits
+        }
+
+    def max_rank(self, text_lower: str) -> int:
+        """命中关键词的最高风险等级序号（无命中为 0），命中 CRITICAL 即停止扫描"""
+        ranks = self.ranks
+        top = _RISK_RANK[RiskLevel.CRITICAL]
+        best = 0
+        if self.automaton is not None:
+            hits = (kw for _, kw in self.automaton.iter(text_lower))
+        else:
+            hits = (match.group(1) for match in self.regex.finditer(text_lower))
+        for kw in hits:
+            rank = ranks[kw]
+            if rank > best:
+                best = rank
+                if best == top:
+                    break
+        return best
+
+
+_DEFAULT_MATCHER = _KeywordMatcher(RISK_KEYWORDS)
+
+# 不同评论内容达到该数量才值得启动进程池扫描
+_PROCESS_MIN_TEXTS = 1000
+
+
+def _match_texts(risk_keywords: Optional[Dict[str, dict]], texts: List[str]) -> List[Dict[str, List[str]]]:
+    """进程池任务：扫描一批评论内容（risk_keywords 为 None 时使用默认匹配器）"""
+    matcher = _DEFAULT_MATCHER if risk_keywords is None else _KeywordMatcher(risk_keywords)
+    return [matcher.match(text.lower()) for text in texts]
+
+
 class RiskDetector:
     """
     高风险差评检测器
@@ -157,12 +408,35 @@ class RiskDetector:
     - 投诉风险（强烈不满、投诉意向）
     """
 
-    def __init__(self, custom_keywords: Dict[str, List[str]] = None):
-        self.risk_keywords = RISK_KEYWORDS.copy()
+    def __init__(self, custom_keywords: Dict[str, List[str]] = None, workers: int = 0):
+        """
+        Args:
+            custom_keywords: 追加到各类目的自定义关键词
+            workers: batch_detect 扫描大批量评论时的进程数，0表示在当前进程扫描，-1表示CPU核数
+        """
+        self.workers = (os.cpu_count() or 1) if workers < 0 else workers
+
+        # 关键词列表逐类目复制，自定义关键词不会写回全局配置
+        self.risk_keywords = {
+            category: {**config, "keywords": list(config["keywords"])}
+            for category, config in RISK_KEYWORDS.items()
+        }
+        extended = False
         if custom_keywords:
             for category, keywords in custom_keywords.items():
                 if category in self.risk_keywords:
                     self.risk_keywords[category]["keywords"].extend(keywords)
+                    extended = extended or bool(keywords)
+
+        # 默认关键词共用模块级匹配器（detect_review_risk 等每次新建检测器也无需重建）
+        self._matcher = _KeywordMatcher(self.risk_keywords) if extended else _DEFAULT_MATCHER
+        self._extended = extended
+
+        # 类目 -> (提醒文案, 风险等级序号)，与匹配器一样在初始化时固定，检测时不再查配置字典
+        self._category_rules = {
+            category: (config["alert_message"], _RISK_RANK[config["risk_level"]])
+            for category, config in self.risk_keywords.items()
+        }
 
     def detect(self, text: str, rating: int = None) -> Dict[str, Any]:
         """
@@ -180,63 +454,89 @@ class RiskDetector:
                 "matched_keywords": {"category": ["keyword1"]}
             }
         """
-        text_lower = text.lower()
+        return self._assess(self._matcher.match(text.lower()), rating)
 
+    def _assess(self, category_matches: Dict[str, List[str]], rating: Optional[int]) -> Dict[str, Any]:
+        """根据各类目命中的关键词和评分确定风险等级、标记和提醒"""
+        rules = self._category_rules
         flags = []
         alerts = []
-        matched = {}
-        max_risk = RiskLevel.LOW
-
-        # 扫描各类风险关键词
-        for category, config in self.risk_keywords.items():
-            found_keywords = [
-                kw for kw in config["keywords"]
-                if kw in text_lower
-            ]
-
-            if found_keywords:
-                matched[category] = found_keywords
-                flags.append(f"{category}:{len(found_keywords)}")
-                alerts.append(config["alert_message"])
-
-                # 更新最高风险等级
-                if config["risk_level"].value == "critical":
-                    max_risk = RiskLevel.CRITICAL
-                elif config["risk_level"].value == "high" and max_risk != RiskLevel.CRITICAL:
-                    max_risk = RiskLevel.HIGH
-                elif config["risk_level"].value == "medium" and max_risk == RiskLevel.LOW:
-                    max_risk = RiskLevel.MEDIUM
+        max_rank = 0
+
+        # 汇总各类风险关键词，取最高风险等级
+        for category, found_keywords in category_matches.items():
+            alert_message, rank = rules[category]
+            flags.append(f"{category}:{len(found_keywords)}")
+            alerts.append(alert_message)
+            if rank > max_rank:
+                max_rank = rank
+        max_risk = _RISK_ORDER[max_rank]
 
         # 低评分提升风险等级
         if rating is not None and rating <= 2:
-            if max_risk == RiskLevel.LOW:
-                max_risk = RiskLevel.MEDIUM
-            elif max_risk == RiskLevel.MEDIUM:
-                max_risk = RiskLevel.HIGH
+            max_risk = _LOW_RATING_ESCALATION.get(max_risk, max_risk)
             flags.append("low_rating")
 
         return {
             "risk_level": max_risk,
             "flags": flags,
             "alerts": alerts,
-            "matched_keywords": matched
+            "matched_keywords": dict(category_matches)
         }
 
-    def batch_detect(self, reviews: List[ReviewSchema]) -> List[ReviewSchema]:
-        """批量检测并更新评论的风险信息"""
+    def classify(self, text: str, rating: int = None) -> RiskLevel:
+        """
+        只判定风险等级（不统计标记、提醒和命中关键词），命中紧急类关键词后立即返回
+
+        结果与 detect(text, rating)["risk_level"] 一致，适合只需按等级分流的批量场景
+        """
+        risk = _RISK_ORDER[self._matcher.max_rank(text.lower())]
+        if rating is not None and rating <= 2:
+            risk = _LOW_RATING_ESCALATION.get(risk, risk)
+        return risk
+
+    def batch_detect(self, reviews: List[ReviewSchema], with_flags: bool = True) -> List[ReviewSchema]:
+        """
+        批量检测并更新评论的风险信息（相同内容的评论只扫描一次）
+
+        Args:
+            reviews: 评论列表
+            with_flags: 为 False 时只更新 risk_level（走 classify 快速路径），不生成 risk_flags
+        """
+        if not with_flags:
+            for review in reviews:
+                review.risk_level = self.classify(review.content, review.rating)
+            return reviews
+
+        matches = self._match_many(list(dict.fromkeys(review.content for review in reviews)))
         for review in reviews:
-            result = self.detect(review.content, review.rating)
+            result = self._assess(matches[review.content], review.rating)
             review.risk_level = result["risk_level"]
-            review.risk_flags = result["flags"]
+            review.risk_flags = result["flags"] or None  # 无标记时不保留空列表
         return reviews
 
+    def _match_many(self, texts: List[str]) -> Dict[str, Dict[str, List[str]]]:
+        """扫描去重后的评论内容；匹配在 Python 层持有 GIL，大批量时放到进程池"""
+        if self.workers <= 1 or len(texts) < _PROCESS_MIN_TEXTS:
+            return {text: self._matcher.match(text.lower()) for text in texts}
+
+        # 每个任务带一批内容，减少进程间往返；自定义关键词由子进程按配置重建匹配器
+        size = -(-len(texts) // (self.workers * 4))
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        risk_keywords = self.risk_keywords if self._extended else None
+        matches: Dict[str, Dict[str, List[str]]] = {}
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for chunk, results in zip(chunks, executor.map(_match_texts, repeat(risk_keywords), chunks)):
+                matches.update(zip(chunk, results))
+        return matches
+
     def get_critical_reviews(self, reviews: List[ReviewSchema]) -> List[ReviewSchema]:
         """筛选出紧急风险评论"""
-        return [r for r in reviews if r.risk_level == RiskLevel.CRITICAL]
+        return [r for r in reviews if r.risk_level is RiskLevel.CRITICAL]
 
     def get_high_risk_reviews(self, reviews: List[ReviewSchema]) -> List[ReviewSchema]:
         """筛选出高风险评论"""
-        return [r for r in reviews if r.risk_level in [RiskLevel.CRITICAL, RiskLevel.HIGH]]
+        return [r for r in reviews if r.risk_level in _HIGH_RISK_LEVELS]
 
 
 class ShopifyDataImporter:
@@ -266,7 +566,7 @@ class ShopifyDataImporter:
 
     def import_from_csv(
         self,
-        csv_content: Union[str, bytes],
+        csv_content: Union[str, bytes, IO],
         delimiter: str = ",",
         encoding: str = "utf-8"
     ) -> ImportResult:
@@ -274,27 +574,47 @@ class ShopifyDataImporter:
         从 CSV 导入评论
 
         Args:
-            csv_content: CSV 内容（字符串或字节）
+            csv_content: CSV 内容（字符串或字节），也可以是文本/二进制文件对象（如上传文件句柄），按行流式读取
             delimiter: 分隔符
-            encoding: 编码
+            encoding: 编码（字节内容和二进制文件对象使用）
         """
         errors = []
         reviews = []
+        wrapper = None
 
         try:
-            # 处理字节输入
+            # 字节输入边读边解码，不再整体 decode 出一份完整的字符串副本
             if isinstance(csv_content, bytes):
-                csv_content = csv_content.decode(encoding)
+                stream = io.TextIOWrapper(io.BytesIO(csv_content), encoding=encoding, newline="")
+            elif isinstance(csv_content, str):
+                stream = io.StringIO(csv_content)
+            elif isinstance(csv_content, io.TextIOBase):
+                stream = csv_content
+            else:
+                stream = wrapper = io.TextIOWrapper(csv_content, encoding=encoding, newline="")
 
             # 解析 CSV
-            reader = csv.DictReader(io.StringIO(csv_content), delimiter=delimiter)
-
-            # 映射列名
-            column_map = self._detect_columns(reader.fieldnames)
-
-            for idx, row in enumerate(reader):
+            # 用 csv.reader 按列下标取值，避免 DictReader 为每行构造字典
+            reader = csv.reader(stream, delimiter=delimiter)
+            header = next(reader, None)
+
+            # 映射列名，并一次性解析为列下标（重名列取最后一列，与 DictReader 一致）
+            column_map = self._detect_columns(header)
+            positions = {name: i for i, name in enumerate(header)}
+            column_idx = {field: positions[name] for field, name in column_map.items()}
+
+            # 大文件优先交给 pyarrow 列式解析，不可用时逐行读取
+            arrow = None
+            if isinstance(csv_content, (str, bytes)) and len(csv_content) >= _ARROW_MIN_SIZE:
+                arrow = _read_csv_arrow(csv_content, delimiter, header, column_idx, encoding)
+            if arrow is not None:
+                rows, column_idx = arrow
+            else:
+                rows = (row for row in reader if row)  # 与 DictReader 一样跳过空行
+            idx = -1
+            for idx, row in enumerate(rows):
                 try:
-                    review = self._parse_csv_row(row, column_map, idx)
+                    review = self._parse_csv_row(row, column_idx, idx)
                     if review:
                         reviews.append(review)
                 except Exception as e:
@@ -305,7 +625,7 @@ class ShopifyDataImporter:
 
             return ImportResult(
                 success=len(errors) == 0,
-                total_records=idx + 1 if 'idx' in locals() else 0,
+                total_records=idx + 1,
                 imported_count=len(reviews),
                 failed_count=len(errors),
                 errors=errors,
@@ -320,6 +640,10 @@ class ShopifyDataImporter:
                 failed_count=1,
                 errors=[f"CSV 解析失败: {str(e)}"]
             )
+        finally:
+            # 只解除包装，调用方传入的文件对象由调用方关闭
+            if wrapper is not None:
+                wrapper.detach()
 
     def _detect_columns(self, fieldnames: List[str]) -> Dict[str, str]:
         """自动检测 CSV 列名映射"""
@@ -333,55 +657,52 @@ class ShopifyDataImporter:
 
         return column_map
 
-    def _parse_csv_row(self, row: dict, column_map: dict, idx: int) -> Optional[ReviewSchema]:
-        """解析单行 CSV 数据"""
+    def _parse_csv_row(self, row: Sequence[str], column_idx: Dict[str, int], idx: int) -> Optional[ReviewSchema]:
+        """解析单行 CSV 数据（row 为字段序列，column_idx 为 目标字段 -> 下标）"""
+        width = len(row)
+
+        def cell(field: str) -> Optional[str]:
+            pos = column_idx.get(field)
+            return row[pos] if pos is not None and pos < width else None
+
         # 获取内容（必填）
-        content_col = column_map.get("content")
-        if not content_col or not row.get(content_col):
+        content = cell("content")
+        if not content:
             return None
 
-        content = row[content_col].strip()
+        content = content.strip()
         if not content:
             return None
 
         # 获取评分
-        rating_col = column_map.get("rating")
         rating = 3  # 默认中评
-        if rating_col and row.get(rating_col):
-            try:
-                rating = int(float(row[rating_col]))
-                rating = max(1, min(5, rating))  # 限制 1-5
-            except:
-                pass
+        raw_rating = cell("rating")
+        if raw_rating:
+            fast = _RATING_VALUES.get(raw_rating)
+            if fast is not None:
+                rating = fast
+            else:
+                try:
+                    rating = int(float(raw_rating))
+                    rating = max(1, min(5, rating))  # 限制 1-5
+                except (ValueError, OverflowError):
+                    pass
 
         # 获取时间
         created_at = None
-        date_col = column_map.get("created_at")
-        if date_col and row.get(date_col):
-            try:
-                # 尝试多种日期格式
-                date_str = row[date_col]
-                for fmt in ["%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"]:
-                    try:
-                        created_at = datetime.strptime(date_str, fmt)
-                        break
-                    except:
-                        continue
-            except:
-                pass
+        raw_date = cell("created_at")
+        if raw_date:
+            created_at = _parse_date(raw_date)
 
         # 构建 ReviewSchema
-        review_id_col = column_map.get("review_id")
-        review_id = row.get(review_id_col, "") if review_id_col else f"csv_{idx}"
-
         return ReviewSchema(
-            review_id=review_id or f"csv_{idx}",
+            review_id=cell("review_id") or f"csv_{idx}",
             content=content,
             rating=rating,
             created_at=created_at,
-            product_id=row.get(column_map.get("product_id", ""), ""),
-            product_name=row.get(column_map.get("product_name", ""), ""),
-            customer_name=row.get(column_map.get("customer_name", ""), ""),
+            product_id=cell("product_id") or "",
+            product_name=cell("product_name") or "",
+            customer_name=cell("customer_name") or "",
             source=ImportSource.CSV_UPLOAD
         )
 
@@ -439,21 +760,28 @@ class ShopifyDataImporter:
                 "action_items": [...]
             }
         """
-        # 统计各风险等级数量
+        # 各风险等级计数由 Counter 在 C 层完成（无等级的评论计入 None，不参与统计）
+        level_counts = Counter(map(attrgetter("risk_level"), reviews))
         risk_counts = {
-            RiskLevel.CRITICAL.value: 0,
-            RiskLevel.HIGH.value: 0,
-            RiskLevel.MEDIUM.value: 0,
-            RiskLevel.LOW.value: 0
+            RiskLevel.CRITICAL.value: level_counts[RiskLevel.CRITICAL],
+            RiskLevel.HIGH.value: level_counts[RiskLevel.HIGH],
+            RiskLevel.MEDIUM.value: level_counts[RiskLevel.MEDIUM],
+            RiskLevel.LOW.value: level_counts[RiskLevel.LOW]
         }
 
-        for review in reviews:
-            if review.risk_level:
-                risk_counts[review.risk_level.value] += 1
-
-        # 筛选高风险评论
-        critical = self.risk_detector.get_critical_reviews(reviews)
-        high_risk = self.risk_detector.get_high_risk_reviews(reviews)
+        # 有紧急/高风险评论时才遍历收集（保持原顺序）
+        critical = []
+        high_risk = []      # 紧急 + 高风险
+        high_only_ids = []  # 仅高风险（不含紧急）
+        if level_counts[RiskLevel.CRITICAL] or level_counts[RiskLevel.HIGH]:
+            for review in reviews:
+                level = review.risk_level
+                if level is RiskLevel.CRITICAL:
+                    critical.append(review)
+                    high_risk.append(review)
+                elif level is RiskLevel.HIGH:
+                    high_risk.append(review)
+                    high_only_ids.append(review.review_id)
 
         # 生成行动建议
         action_items = []
@@ -469,9 +797,18 @@ class ShopifyDataImporter:
             action_items.append({
                 "priority": "高",
                 "action": f"24小时内回复 {len(high_risk) - len(critical)} 条高风险差评",
-                "reviews": [r.review_id for r in high_risk if r not in critical]
+                "reviews": high_only_ids
             })
 
+        # 高风险列表最多显示10条；其中的紧急评论按相同顺序出现在 critical 中，直接复用其字典
+        critical_dicts = [r.to_dict() for r in critical]
+        high_risk_dicts = []
+        shared = iter(critical_dicts)
+        for review in high_risk[:10]:
+            high_risk_dicts.append(
+                next(shared) if review.risk_level is RiskLevel.CRITICAL else review.to_dict()
+            )
+
         return {
             "summary": {
                 "total_reviews": len(reviews),
@@ -479,22 +816,27 @@ class ShopifyDataImporter:
                 "critical_count": len(critical),
                 "high_risk_count": len(high_risk)
             },
-            "critical_reviews": [r.to_dict() for r in critical],
-            "high_risk_reviews": [r.to_dict() for r in high_risk[:10]],  # 最多显示10条
+            "critical_reviews": critical_dicts,
+            "high_risk_reviews": high_risk_dicts,
             "action_items": action_items
         }
 
 
 # ============ 便捷函数 ============
 
-def import_reviews_from_csv(csv_content: Union[str, bytes], **kwargs) -> ImportResult:
+def import_reviews_from_csv(csv_content: Union[str, bytes, IO], **kwargs) -> ImportResult:
     """快速从 CSV 导入评论"""
     importer = ShopifyDataImporter()
     return importer.import_from_csv(csv_content, **kwargs)
 
 
+@lru_cache(maxsize=1)
+def _default_detector() -> RiskDetector:
+    """默认配置的检测器（只读使用），便捷函数之间共用"""
+    return RiskDetector()
+
+
 def detect_review_risk(text: str, rating: int = None) -> Dict[str, Any]:
     """快速检测单条评论风险"""
-    detector = RiskDetector()
-    return detector.detect(text, rating)
+    return _default_detector().detect(text, rating)
 
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn 生产部署配置
+=====================
+启动: gunicorn main:app -c gunicorn.conf.py
+
+preload_app 让主进程在 fork 前加载模型，多个 worker 共享同一份模型内存（写时复制）
+"""
+
+import os
+
+# 主进程导入应用时预加载模型（仅 CPU 推理生效，见 main.py）
+os.environ.setdefault("PRELOAD_MODELS", "true")
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
@@ -12,7 +12,21 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.core.database import init_async_db
-from app.api.routes import router
+from app.api.routes import (
+    router, run_blocking, create_analyzer, create_coalescer, create_insight_cache
+)
+from app.api.responses import ORJSONResponse
+
+
+# 预加载模型：gunicorn --preload 会在 fork 前导入本模块，各 worker 共享已加载的权重。
+# CUDA 上下文不能跨 fork 使用，所以只在 CPU 推理时预加载，GPU 部署仍由各 worker 启动时加载
+_preloaded_analyzer = None
+if settings.preload_models:
+    if settings.nlp.device == "cpu":
+        _preloaded_analyzer = create_analyzer()
+        _preloaded_analyzer.warmup()
+    else:
+        print("⚠️ 预加载仅支持 DEVICE=cpu，模型将在各 worker 启动时加载")
 
 
 @asynccontextmanager
@@ -29,9 +43,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ 数据库初始化失败: {e}")
     
+    # 加载并预热模型（避免首个请求承担模型加载耗时）
+    app.state.analyzer = _preloaded_analyzer or create_analyzer()
+    app.state.insight_cache = create_insight_cache()
+    app.state.coalescer = create_coalescer(app.state.analyzer, app.state.insight_cache)
+    try:
+        await run_blocking(app.state.analyzer.analyze_single, "Das Produkt ist gut.")
+        print("🧠 NLP模型已加载")
+    except Exception as e:
+        print(f"⚠️ 模型预热失败: {e}")
+    
     yield
     
     # 关闭时
+    await app.state.coalescer.close()
+    if app.state.insight_cache:
+        await app.state.insight_cache.close()
     print("👋 应用关闭")
 
 
@@ -40,6 +67,7 @@ app = FastAPI(
     title=settings.app_name,
     version=settings.version,
     description="德国电商智能分析平台 - 帮中国卖家看懂德国市场",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -16,6 +16,14 @@ st.set_page_config(
     layout="wide"
 )
 
+
+@st.cache_resource
+def get_analyzer(translate: bool):
+    """按翻译开关缓存分析器，脚本重跑（每次点击）时复用已加载的模型"""
+    from app.services import ReviewAnalyzer
+    return ReviewAnalyzer(translate=translate)
+
+
 # 标题
 st.title("🇩🇪 GermanMarket.AI")
 st.caption("德国电商智能分析平台 - 帮中国卖家看懂德国市场")
@@ -54,9 +62,7 @@ if page == "📊 评论分析":
         if analyze_btn and text:
             with st.spinner("分析中..."):
                 try:
-                    # 导入分析器
-                    from app.services import ReviewAnalyzer
-                    analyzer = ReviewAnalyzer(translate=translate_opt)
+                    analyzer = get_analyzer(translate_opt)
                     result = analyzer.analyze_single(text)
                     
                     # 显示结果
@@ -104,14 +110,16 @@ if page == "📊 评论分析":
         if uploaded_file:
             try:
                 if uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(uploaded_file)
-                    # 查找评论列
+                    # 先只读表头查找评论列，再用 C 引擎单独读取该列（按字符串读取，跳过类型推断）
+                    columns = pd.read_csv(uploaded_file, nrows=0).columns
                     text_col = None
                     for col in ['review', 'text', 'comment', 'Bewertung']:
-                        if col in df.columns:
+                        if col in columns:
                             text_col = col
                             break
                     if text_col:
+                        uploaded_file.seek(0)
+                        df = pd.read_csv(uploaded_file, usecols=[text_col], dtype={text_col: str}, engine="c")
                         reviews = df[text_col].dropna().tolist()
                     else:
                         st.error("未找到评论列，请确保CSV包含'review'或'text'列")
@@ -125,8 +133,7 @@ if page == "📊 评论分析":
 
                     if st.button("🚀 开始批量分析", type="primary"):
                         with st.spinner(f"正在分析 {len(reviews)} 条评论..."):
-                            from app.services import ReviewAnalyzer
-                            analyzer = ReviewAnalyzer(translate=False)  # 批量不翻译
+                            analyzer = get_analyzer(False)  # 批量不翻译
                             report = analyzer.analyze_batch(reviews[:50])  # 限制50条
 
                             st.success("分析完成!")
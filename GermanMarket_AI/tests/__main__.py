@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+测试入口：python -m tests [pytest参数...]
+
+等价于直接运行 pytest，可使用 -n auto（并行）、--lf（仅重跑上次失败）等全部功能；
+未指定测试路径时只收集 tests/ 目录（避免误收集根目录下需要加载模型的 test_nlp.py）
+"""
+
+import os
+import sys
+
+import pytest
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not any(os.path.exists(arg.split("::")[0]) for arg in args):
+        args.append(os.path.dirname(os.path.abspath(__file__)))
+    raise SystemExit(pytest.main(args))
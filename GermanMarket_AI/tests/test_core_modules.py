@@ -7,35 +7,93 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import logging
+import re
 from datetime import datetime, timedelta
 
+import pytest
+
+from app.services.influencer import InfluencerEvaluator, InfluencerProfile, Platform
+from app.services.content import OutreachGenerator, OutreachContext, ToneMode
+from app.services.shopify import import_reviews_from_csv, detect_review_risk, RiskLevel
+
+log = logging.getLogger(__name__)
+
+
+# 评估器/生成器对输入无状态，整个测试会话每种配置共用一个实例
+@pytest.fixture(scope="session")
+def fashion_evaluator():
+    return InfluencerEvaluator(target_niche="fashion")
+
+
+@pytest.fixture(scope="session")
+def default_evaluator():
+    return InfluencerEvaluator()
+
+
+@pytest.fixture(scope="session")
+def formal_generator():
+    return OutreachGenerator(tone=ToneMode.FORMAL)
+
+
+@pytest.fixture(scope="session")
+def friendly_generator():
+    return OutreachGenerator(tone=ToneMode.FRIENDLY)
+
+
+# 发帖时间的基准时刻只取一次；评估器按当前时间计算活跃度，因此不能用固定日期
+ANCHOR = datetime.now()
+
+
+def make_healthy_profile():
+    """健康的德国时尚博主"""
+    return InfluencerProfile(
+        platform=Platform.INSTAGRAM,
+        username="test_influencer",
+        followers=50000,
+        following=500,
+        posts_count=200,
+        avg_likes=2500,
+        avg_comments=150,
+        bio="Nachhaltige Mode aus Berlin 🌿 | Qualität über Quantität",
+        recent_captions=["Mein neues nachhaltiges Outfit", "Umweltfreundlich und stylisch"],
+        hashtags=["nachhaltig", "fashion", "berlin", "sustainable"],
+        recent_post_dates=[ANCHOR - timedelta(days=i) for i in range(1, 11)]
+    )
+
+
+def make_fake_profile():
+    """疑似刷量账号：粉丝多但互动异常低"""
+    return InfluencerProfile(
+        platform=Platform.INSTAGRAM,
+        username="suspicious_account",
+        followers=100000,
+        following=8000,  # 关注太多（互关党特征）
+        posts_count=50,
+        avg_likes=200,   # 10万粉只有200赞（0.2%互动率）
+        avg_comments=5,
+        bio="Follow for follow",
+        recent_post_dates=[ANCHOR - timedelta(days=45)]  # 很久没更新
+    )
+
+
+# 评估器不修改输入画像，画像在本模块内共用
+@pytest.fixture(scope="module")
+def healthy_profile():
+    return make_healthy_profile()
+
+
+@pytest.fixture(scope="module")
+def fake_profile():
+    return make_fake_profile()
+
 
 class TestInfluencerEvaluator:
     """红人评估器测试"""
     
-    def test_evaluator_basic(self):
+    def test_evaluator_basic(self, fashion_evaluator, healthy_profile):
         """基础评估流程"""
-        from app.services.influencer import (
-            InfluencerEvaluator, InfluencerProfile, Platform
-        )
-        
-        # 构造测试数据：一个健康的德国时尚博主
-        profile = InfluencerProfile(
-            platform=Platform.INSTAGRAM,
-            username="test_influencer",
-            followers=50000,
-            following=500,
-            posts_count=200,
-            avg_likes=2500,
-            avg_comments=150,
-            bio="Nachhaltige Mode aus Berlin 🌿 | Qualität über Quantität",
-            recent_captions=["Mein neues nachhaltiges Outfit", "Umweltfreundlich und stylisch"],
-            hashtags=["nachhaltig", "fashion", "berlin", "sustainable"],
-            recent_post_dates=[datetime.now() - timedelta(days=i) for i in range(1, 11)]
-        )
-        
-        evaluator = InfluencerEvaluator(target_niche="fashion")
-        result = evaluator.evaluate(profile)
+        result = fashion_evaluator.evaluate(healthy_profile)
         
         # 验证结果结构
         assert result.username == "test_influencer"
@@ -51,49 +109,57 @@ class TestInfluencerEvaluator:
         # 应该检测到可持续性关键词
         assert result.german_market_fit.get("sustainability_focus") == True
         
-        print(f"评估结果: {result.grade} ({result.total_score:.1f}分)")
-        print(f"德国市场契合度: {result.german_market_fit}")
+        log.info("评估结果: %s (%.1f分)", result.grade, result.total_score)
+        log.info("德国市场契合度: %s", result.german_market_fit)
 
-    def test_fake_influencer_detection(self):
+    def test_fake_influencer_detection(self, default_evaluator, fake_profile):
         """检测疑似刷量账号"""
-        from app.services.influencer import (
-            InfluencerEvaluator, InfluencerProfile, Platform
-        )
-        
-        # 构造可疑数据：粉丝多但互动异常低
-        fake_profile = InfluencerProfile(
-            platform=Platform.INSTAGRAM,
-            username="suspicious_account",
-            followers=100000,
-            following=8000,  # 关注太多（互关党特征）
-            posts_count=50,
-            avg_likes=200,   # 10万粉只有200赞（0.2%互动率）
-            avg_comments=5,
-            bio="Follow for follow",
-            recent_post_dates=[datetime.now() - timedelta(days=45)]  # 很久没更新
-        )
-        
-        evaluator = InfluencerEvaluator()
-        result = evaluator.evaluate(fake_profile)
+        result = default_evaluator.evaluate(fake_profile)
         
         # 应该得到较低分
         assert result.total_score < 50
         # 应该有风险标记
         assert len(result.risk_flags) > 0
         
-        print(f"可疑账号评分: {result.grade} ({result.total_score:.1f}分)")
-        print(f"风险标记: {result.risk_flags}")
+        log.info("可疑账号评分: %s (%.1f分)", result.grade, result.total_score)
+        log.info("风险标记: %s", result.risk_flags)
+
+    def test_batch_matches_single(self, fashion_evaluator):
+        """向量化批量评估与逐个评估结果一致"""
+        profiles = [
+            InfluencerProfile(
+                platform=platform,
+                username=f"user_{i}",
+                followers=followers,
+                following=following,
+                posts_count=posts,
+                avg_likes=likes,
+                avg_comments=comments,
+                bio="Ich teste nachhaltige Mode und Technik",
+                recent_post_dates=[ANCHOR - timedelta(days=d) for d in range(0, days, 3)]
+            )
+            for i, (platform, followers, following, posts, likes, comments, days) in enumerate([
+                (Platform.INSTAGRAM, 50000, 500, 200, 2500, 150, 30),
+                (Platform.INSTAGRAM, 2000000, 100, 80, 30000, 10, 10),
+                (Platform.TIKTOK, 120000, 120000, 15, 40000, 900, 60),
+                (Platform.YOUTUBE, 8000, 0, 0, 0, 0, 0),
+                (Platform.YOUTUBE, 300000, 50, 45, 5000, 400, 90),
+            ])
+        ]
+        
+        assert fashion_evaluator.evaluate_batch(profiles) == [fashion_evaluator.evaluate(p) for p in profiles]
+        assert fashion_evaluator.evaluate_batch([]) == []
+        assert fashion_evaluator.score_batch(profiles).tolist() == [
+            fashion_evaluator.evaluate(p).total_score for p in profiles
+        ]
+        assert len(fashion_evaluator.score_batch([])) == 0
 
 
 class TestOutreachGenerator:
     """开发信生成器测试"""
     
-    def test_formal_mode(self):
+    def test_formal_mode(self, formal_generator):
         """严谨商务模式"""
-        from app.services.content import (
-            OutreachGenerator, OutreachContext, ToneMode
-        )
-        
         context = OutreachContext(
             influencer_name="Frau Schmidt",
             platform="instagram",
@@ -105,8 +171,7 @@ class TestOutreachGenerator:
             company_name="EcoStyle GmbH"
         )
         
-        generator = OutreachGenerator(tone=ToneMode.FORMAL)
-        result = generator.generate(context)
+        result = formal_generator.generate(context)
         
         # 验证结构
         assert result.subject
@@ -115,19 +180,15 @@ class TestOutreachGenerator:
         assert result.gdpr_compliant == True
         
         # 验证GDPR合规内容
-        assert "Datenschutz" in result.body or "weiteren Nachrichten" in result.body
+        assert re.search(r"Datenschutz|weiteren Nachrichten|Widerspruch", result.body)
         assert len(result.compliance_notes) >= 2
         
-        print("=== 严谨商务模式 ===")
-        print(f"主题: {result.subject}")
-        print(f"正文:\n{result.body[:500]}...")
+        log.info("=== 严谨商务模式 ===")
+        log.info("主题: %s", result.subject)
+        log.info("正文:\n%s...", result.body[:500])
 
-    def test_friendly_mode(self):
+    def test_friendly_mode(self, friendly_generator):
         """社交媒体亲和模式"""
-        from app.services.content import (
-            OutreachGenerator, OutreachContext, ToneMode
-        )
-        
         context = OutreachContext(
             influencer_name="Anna",
             platform="tiktok",
@@ -137,15 +198,48 @@ class TestOutreachGenerator:
             product_name="Bio-Serum"
         )
         
-        generator = OutreachGenerator(tone=ToneMode.FRIENDLY)
-        result = generator.generate(context)
+        result = friendly_generator.generate(context)
         
         assert result.tone_mode == "friendly"
         # 友好模式应该有emoji或更轻松的用语
         
-        print("\n=== 社交媒体亲和模式 ===")
-        print(f"主题: {result.subject}")
-        print(f"正文:\n{result.body[:500]}...")
+        log.info("\n=== 社交媒体亲和模式 ===")
+        log.info("主题: %s", result.subject)
+        log.info("正文:\n%s...", result.body[:500])
+
+    def test_deterministic_preview(self):
+        """deterministic 模式输出可复现，预览不修改当前语气"""
+        context = OutreachContext(
+            influencer_name="Anna",
+            platform="instagram",
+            brand_name="GlowUp",
+            product_name="Bio-Serum"
+        )
+        
+        generator = OutreachGenerator(tone=ToneMode.FRIENDLY)
+        first = generator.generate(context, deterministic=True)
+        second = OutreachGenerator(tone=ToneMode.FRIENDLY).generate(context, deterministic=True)
+        assert first.to_dict() == second.to_dict()
+        
+        previews = generator.preview_both_tones(context, deterministic=True)
+        assert set(previews) == {"formal", "friendly"}
+        assert previews["friendly"].body == first.body
+        assert generator.tone == ToneMode.FRIENDLY
+        
+        # 修改返回的预览不影响缓存
+        previews["formal"].body += "\nPS"
+        previews["formal"].compliance_notes.append("extra")
+        again = generator.preview_both_tones(context, deterministic=True)
+        assert not again["formal"].body.endswith("\nPS")
+        assert "extra" not in again["formal"].compliance_notes
+
+    def test_signature_uses_current_sender(self, formal_generator):
+        """构造后修改发件人信息，签名按当前值生成"""
+        context = OutreachContext(influencer_name="Anna", platform="instagram")
+        context.sender_name, context.company_name = "Max", "Acme GmbH"
+        
+        result = formal_generator.generate(context, deterministic=True)
+        assert "\nMax\nAcme GmbH" in result.body
 
 
 class TestShopifyIntegration:
@@ -153,8 +247,6 @@ class TestShopifyIntegration:
     
     def test_csv_import(self):
         """CSV导入测试"""
-        from app.services.shopify import import_reviews_from_csv
-        
         # 模拟CSV内容
         csv_content = """review_id,content,rating,product_name,date
 1,"Das Produkt ist super! Schnelle Lieferung.",5,Handtasche,2024-01-15
@@ -170,13 +262,11 @@ class TestShopifyIntegration:
         assert result.imported_count == 5
         assert len(result.reviews) == 5
         
-        print(f"\n=== CSV导入测试 ===")
-        print(f"导入成功: {result.imported_count} 条")
+        log.info("\n=== CSV导入测试 ===")
+        log.info("导入成功: %s 条", result.imported_count)
 
     def test_risk_detection(self):
         """高风险差评检测"""
-        from app.services.shopify import detect_review_risk, RiskLevel
-        
         # 测试法律风险
         legal_risk = detect_review_risk(
             "Ich werde meinen Anwalt einschalten! Das ist Betrug!",
@@ -206,35 +296,26 @@ class TestShopifyIntegration:
         )
         assert normal["risk_level"] == RiskLevel.LOW
         
-        print("\n=== 风险检测测试 ===")
-        print(f"法律风险: {legal_risk['risk_level'].value} - {legal_risk['alerts']}")
-        print(f"安全风险: {safety_risk['risk_level'].value}")
-        print(f"退款风险: {refund_risk['risk_level'].value}")
-        print(f"正常评论: {normal['risk_level'].value}")
+        log.info("\n=== 风险检测测试 ===")
+        log.info("法律风险: %s - %s", legal_risk['risk_level'].value, legal_risk['alerts'])
+        log.info("安全风险: %s", safety_risk['risk_level'].value)
+        log.info("退款风险: %s", refund_risk['risk_level'].value)
+        log.info("正常评论: %s", normal['risk_level'].value)
 
 
-if __name__ == "__main__":
-    # 快速运行测试
-    print("=" * 60)
-    print("GermanMarket.AI 核心模块测试")
-    print("=" * 60)
-    
-    # 红人评估测试
-    test_influencer = TestInfluencerEvaluator()
-    test_influencer.test_evaluator_basic()
-    test_influencer.test_fake_influencer_detection()
-    
-    # 开发信生成测试
-    test_outreach = TestOutreachGenerator()
-    test_outreach.test_formal_mode()
-    test_outreach.test_friendly_mode()
-    
-    # Shopify集成测试
-    test_shopify = TestShopifyIntegration()
-    test_shopify.test_csv_import()
-    test_shopify.test_risk_detection()
-    
-    print("\n" + "=" * 60)
-    print("所有测试完成!")
-    print("=" * 60)
 
+class TestSettings:
+    """全局配置测试"""
+    
+    def test_single_settings_entrypoint(self):
+        """配置只有一个入口，阈值默认值与运营约定一致"""
+        from app.core.config import AppSettings, get_settings, settings
+        
+        assert get_settings() is settings
+        
+        fields = AppSettings.model_fields
+        assert fields["threshold_positive"].default == 0.6
+        assert fields["threshold_negative"].default == 0.4
+        assert fields["aspect_good"].default == 0.7
+        assert fields["aspect_bad"].default == 0.4
+        assert fields["aspect_min_count"].default == 3
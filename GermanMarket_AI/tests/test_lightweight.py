@@ -11,15 +11,29 @@ import os
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
+import asyncio
+import logging
+import re
+from collections import Counter
 from datetime import datetime, timedelta
 
+log = logging.getLogger(__name__)
+
 # 直接导入模块文件，避免触发__init__.py的连锁导入
+# （不用 importlib.import_module：按包路径导入会执行 app/services/__init__.py，连带加载 torch/transformers）
 import importlib.util
+from functools import lru_cache
 
+@lru_cache(maxsize=None)
 def load_module_direct(module_name, file_path):
-    """直接加载模块文件"""
+    """直接加载模块文件；同一文件已作为该模块名加载过时直接复用，不重复执行模块代码"""
+    module = sys.modules.get(module_name)
+    if module is not None and getattr(module, "__file__", None) == file_path:
+        return module
+
     spec = importlib.util.spec_from_file_location(module_name, file_path)
     module = importlib.util.module_from_spec(spec)
+    # 执行前必须先注册：dataclass 解析注解、进程池 pickle 都按模块名到 sys.modules 查找
     sys.modules[module_name] = module
     spec.loader.exec_module(module)
     return module
@@ -37,6 +51,10 @@ shopify_module = load_module_direct(
     "shopify_integration",
     os.path.join(project_root, "app/services/shopify/__init__.py")
 )
+batching_module = load_module_direct(
+    "batching",
+    os.path.join(project_root, "app/api/batching.py")
+)
 
 # 从模块中获取类
 InfluencerEvaluator = evaluator_module.InfluencerEvaluator
@@ -59,12 +77,14 @@ RiskLevel = shopify_module.RiskLevel
 import_reviews_from_csv = shopify_module.import_reviews_from_csv
 detect_review_risk = shopify_module.detect_review_risk
 
+BatchCoalescer = batching_module.BatchCoalescer
+
 
 def test_influencer_evaluator():
     """测试红人评估器"""
-    print("\n" + "="*50)
-    print("测试1: 红人评估器 (Influencer Evaluator)")
-    print("="*50)
+    log.info("\n" + "="*50)
+    log.info("测试1: 红人评估器 (Influencer Evaluator)")
+    log.info("="*50)
     
     # 健康的德国时尚博主
     profile = InfluencerProfile(
@@ -88,18 +108,29 @@ def test_influencer_evaluator():
     evaluator = InfluencerEvaluator(target_niche="fashion")
     result = evaluator.evaluate(profile)
     
-    print(f"\n红人: @{result.username} ({result.platform})")
-    print(f"综合评分: {result.total_score:.1f}/100 (等级: {result.grade})")
-    print(f"  - 活跃度: {result.activity_score:.1f}")
-    print(f"  - 真实性: {result.authenticity_score:.1f}")
-    print(f"  - 相关度: {result.relevance_score:.1f}")
-    print(f"\n德国市场契合度:")
-    print(f"  - 可持续性关注: {result.german_market_fit.get('sustainability_focus', False)}")
-    print(f"  - 价值观关键词: {list(result.german_market_fit.get('keywords_found', {}).keys())}")
-    print(f"\n建议: {result.recommendation}")
+    fit = result.german_market_fit
+    log.info(
+        "\n红人: @%s (%s)\n"
+        "综合评分: %.1f/100 (等级: %s)\n"
+        "  - 活跃度: %.1f\n"
+        "  - 真实性: %.1f\n"
+        "  - 相关度: %.1f\n"
+        "\n德国市场契合度:\n"
+        "  - 可持续性关注: %s\n"
+        "  - 价值观关键词: %s\n"
+        "\n建议: %s",
+        result.username, result.platform,
+        result.total_score, result.grade,
+        result.activity_score,
+        result.authenticity_score,
+        result.relevance_score,
+        fit.get('sustainability_focus', False),
+        list(fit.get('keywords_found', {})),
+        result.recommendation
+    )
     
     # 测试可疑账号
-    print("\n--- 测试可疑账号 ---")
+    log.info("\n--- 测试可疑账号 ---")
     fake_profile = InfluencerProfile(
         platform=Platform.INSTAGRAM,
         username="buy_followers_123",
@@ -113,19 +144,27 @@ def test_influencer_evaluator():
     )
     
     fake_result = evaluator.evaluate(fake_profile)
-    print(f"可疑账号: @{fake_result.username}")
-    print(f"评分: {fake_result.total_score:.1f}/100 (等级: {fake_result.grade})")
-    print(f"风险标记: {fake_result.risk_flags}")
+    log.info(
+        "可疑账号: @%s\n评分: %.1f/100 (等级: %s)\n风险标记: %s",
+        fake_result.username, fake_result.total_score, fake_result.grade, fake_result.risk_flags
+    )
     
     assert result.total_score > fake_result.total_score, "健康账号应该比可疑账号分数高"
-    print("\n✅ 红人评估器测试通过!")
+
+    # 垂类关键词按整词匹配："happy" 不应命中 tech 垂类的 "app"
+    tech_result = InfluencerEvaluator(target_niche="tech").evaluate(InfluencerProfile(
+        platform=Platform.INSTAGRAM, username="happy_life", followers=1000, following=100,
+        posts_count=10, bio="happy days"
+    ))
+    assert tech_result.relevance_details["niche_keywords_found"] == {"de": [], "en": []}
+    log.info("\n✅ 红人评估器测试通过!")
 
 
 def test_outreach_generator():
     """测试开发信生成器"""
-    print("\n" + "="*50)
-    print("测试2: 开发信生成器 (Outreach Generator)")
-    print("="*50)
+    log.info("\n" + "="*50)
+    log.info("测试2: 开发信生成器 (Outreach Generator)")
+    log.info("="*50)
     
     context = OutreachContext(
         influencer_name="Frau Schmidt",
@@ -142,36 +181,36 @@ def test_outreach_generator():
     )
     
     # 测试严谨商务模式
-    print("\n--- 严谨商务模式 (Formal) ---")
+    log.info("\n--- 严谨商务模式 (Formal) ---")
     formal_gen = OutreachGenerator(tone=ToneMode.FORMAL)
     formal_result = formal_gen.generate(context)
     
-    print(f"主题: {formal_result.subject}")
-    print(f"正文预览:\n{formal_result.body[:400]}...")
-    print(f"\nGDPR合规: {formal_result.gdpr_compliant}")
-    print(f"合规项: {formal_result.compliance_notes}")
+    log.info("主题: %s", formal_result.subject)
+    log.info("正文预览:\n%s...", formal_result.body[:400])
+    log.info("\nGDPR合规: %s", formal_result.gdpr_compliant)
+    log.info("合规项: %s", formal_result.compliance_notes)
     
     # 测试社交媒体亲和模式
-    print("\n--- 社交媒体亲和模式 (Friendly) ---")
+    log.info("\n--- 社交媒体亲和模式 (Friendly) ---")
     context.influencer_name = "Anna"
     friendly_gen = OutreachGenerator(tone=ToneMode.FRIENDLY)
     friendly_result = friendly_gen.generate(context)
     
-    print(f"主题: {friendly_result.subject}")
-    print(f"正文预览:\n{friendly_result.body[:400]}...")
+    log.info("主题: %s", friendly_result.subject)
+    log.info("正文预览:\n%s...", friendly_result.body[:400])
     
-    assert "Datenschutz" in formal_result.body or "Nachrichten" in formal_result.body
-    print("\n✅ 开发信生成器测试通过!")
+    assert re.search(r"Datenschutz|weiteren Nachrichten|Widerspruch", formal_result.body)
+    log.info("\n✅ 开发信生成器测试通过!")
 
 
 def test_shopify_integration():
     """测试Shopify数据集成"""
-    print("\n" + "="*50)
-    print("测试3: Shopify数据集成 + 风险检测")
-    print("="*50)
+    log.info("\n" + "="*50)
+    log.info("测试3: Shopify数据集成 + 风险检测")
+    log.info("="*50)
     
     # 测试CSV导入
-    print("\n--- CSV导入测试 ---")
+    log.info("\n--- CSV导入测试 ---")
     csv_content = """review_id,content,rating,product_name,date
 1,"Das Produkt ist super! Schnelle Lieferung und tolle Qualität.",5,Handtasche,2024-01-15
 2,"Leider defekt angekommen. Sehr enttäuscht von der Qualität.",2,Handtasche,2024-01-16
@@ -182,18 +221,17 @@ def test_shopify_integration():
 """
     
     result = import_reviews_from_csv(csv_content)
-    print(f"导入结果: {result.imported_count}/{result.total_records} 条成功")
+    log.info("导入结果: %s/%s 条成功", result.imported_count, result.total_records)
     
     # 统计风险分布
-    risk_counts = {}
-    for review in result.reviews:
-        level = review.risk_level.value if review.risk_level else "unknown"
-        risk_counts[level] = risk_counts.get(level, 0) + 1
+    risk_counts = Counter(
+        review.risk_level.value if review.risk_level else "unknown" for review in result.reviews
+    )
     
-    print(f"风险分布: {risk_counts}")
+    log.info("风险分布: %s", dict(risk_counts))
     
     # 测试单条风险检测
-    print("\n--- 风险检测详情 ---")
+    log.info("\n--- 风险检测详情 ---")
     test_cases = [
         ("Ich werde meinen Anwalt einschalten! Betrug!", 1, "法律风险"),
         ("Gefährlich! Verletzung! Krankenhaus!", 1, "安全风险"),
@@ -203,30 +241,32 @@ def test_shopify_integration():
     
     for text, rating, desc in test_cases:
         risk = detect_review_risk(text, rating)
-        print(f"{desc}: {risk['risk_level'].value} | 关键词: {list(risk['matched_keywords'].keys())}")
+        log.info("%s: %s | 关键词: %s", desc, risk['risk_level'].value, list(risk['matched_keywords'].keys()))
     
     # 生成风险报告
-    print("\n--- 风险报告 ---")
+    log.info("\n--- 风险报告 ---")
     importer = ShopifyDataImporter()
     report = importer.generate_risk_report(result.reviews)
     
-    print(f"总评论数: {report['summary']['total_reviews']}")
-    print(f"紧急风险: {report['summary']['critical_count']} 条")
-    print(f"高风险: {report['summary']['high_risk_count']} 条")
+    summary = report['summary']
+    log.info(
+        "总评论数: %s\n紧急风险: %s 条\n高风险: %s 条",
+        summary['total_reviews'], summary['critical_count'], summary['high_risk_count']
+    )
     
     if report['action_items']:
-        print("\n行动建议:")
-        for item in report['action_items']:
-            print(f"  [{item['priority']}] {item['action']}")
+        log.info("\n行动建议:\n%s", "\n".join(
+            f"  [{item['priority']}] {item['action']}" for item in report['action_items']
+        ))
     
-    print("\n✅ Shopify集成测试通过!")
+    log.info("\n✅ Shopify集成测试通过!")
 
 
 def test_privacy_check():
     """测试Privacy_Check函数 (TMG §5合规)"""
-    print("\n" + "="*50)
-    print("测试4: Privacy_Check (TMG §5 Impressum合规)")
-    print("="*50)
+    log.info("\n" + "="*50)
+    log.info("测试4: Privacy_Check (TMG §5 Impressum合规)")
+    log.info("="*50)
 
     # 测试合规邮件
     compliant_email = """
@@ -256,10 +296,10 @@ Datenschutz: Ihre Daten werden nicht weitergegeben.
     )
 
     result = privacy_check(compliant_email, context)
-    print(f"\n合规邮件检查:")
-    print(f"  整体合规: {result.is_compliant}")
-    print(f"  Impressum完整: {result.impressum_complete}")
-    print(f"  已包含: {result.gdpr_elements_present}")
+    log.info("\n合规邮件检查:")
+    log.info("  整体合规: %s", result.is_compliant)
+    log.info("  Impressum完整: %s", result.impressum_complete)
+    log.info("  已包含: %s", result.gdpr_elements_present)
 
     # 测试不合规邮件
     non_compliant_email = """
@@ -271,24 +311,41 @@ Grüße
 """
 
     result2 = privacy_check(non_compliant_email)
-    print(f"\n不合规邮件检查:")
-    print(f"  整体合规: {result2.is_compliant}")
-    print(f"  缺失项: {result2.missing_elements}")
-    print(f"  警告: {result2.warnings}")
+    log.info("\n不合规邮件检查:")
+    log.info("  整体合规: %s", result2.is_compliant)
+    log.info("  缺失项: %s", result2.missing_elements)
+    log.info("  警告: %s", result2.warnings)
+
+    # 公司形式按整词匹配："Magazin" 不应被当作 "AG"
+    result3 = privacy_check("Dein Magazin ist toll. Datenschutz: bitte abmelden.")
+    log.info("\n公司形式误判检查:")
+    log.info("  缺失项: %s", result3.missing_elements)
 
     assert result.is_compliant == True
+    assert result.gdpr_elements_present == ["退订选项 (UWG §7)", "数据保护声明 (GDPR Art.13)"]
     assert result2.is_compliant == False
-    print("\n✅ Privacy_Check测试通过!")
+    assert "公司名称 (TMG §5)" in result3.missing_elements
+    assert "公司名称 (TMG §5)" not in privacy_check("Beispiel UG (haftungsbeschränkt)").missing_elements
+
+    # 上下文构造后修改字段，检查应按当前值进行
+    mutated = OutreachContext(influencer_name="Anna", platform="instagram", company_name="Old", sender_name="Bob")
+    mutated.company_name, mutated.sender_name = "Acme", "Max"
+    signed = "Hallo Anna, Datenschutz: bitte abmelden. Max, Acme"
+    assert privacy_check(signed, mutated).missing_elements == privacy_check(
+        signed, OutreachContext(influencer_name="Anna", platform="instagram", company_name="Acme", sender_name="Max")
+    ).missing_elements
+    assert "公司名称 (TMG §5)" not in privacy_check(signed, mutated).missing_elements
+    log.info("\n✅ Privacy_Check测试通过!")
 
 
 def test_apology_generator():
     """测试道歉信生成器 (Webhook触发场景)"""
-    print("\n" + "="*50)
-    print("测试5: 道歉信生成器 (Webhook触发)")
-    print("="*50)
+    log.info("\n" + "="*50)
+    log.info("测试5: 道歉信生成器 (Webhook触发)")
+    log.info("="*50)
 
     # 测试紧急级别（法律风险）
-    print("\n--- 紧急级别 (Critical) ---")
+    log.info("\n--- 紧急级别 (Critical) ---")
     critical_apology = generate_apology_draft(
         customer_name="Herr Müller",
         review_content="Ich werde meinen Anwalt einschalten! Das ist Betrug!",
@@ -298,13 +355,13 @@ def test_apology_generator():
         company_name="TechShop GmbH"
     )
 
-    print(f"紧急程度: {critical_apology.urgency_level}")
-    print(f"主题: {critical_apology.subject}")
-    print(f"建议补偿: {critical_apology.suggested_compensation}")
-    print(f"后续行动: {critical_apology.follow_up_actions}")
+    log.info("紧急程度: %s", critical_apology.urgency_level)
+    log.info("主题: %s", critical_apology.subject)
+    log.info("建议补偿: %s", critical_apology.suggested_compensation)
+    log.info("后续行动: %s", critical_apology.follow_up_actions)
 
     # 测试高风险级别
-    print("\n--- 高风险级别 (High) ---")
+    log.info("\n--- 高风险级别 (High) ---")
     high_apology = generate_apology_draft(
         customer_name="Frau Weber",
         review_content="Produkt defekt! Möchte Rückerstattung!",
@@ -312,31 +369,58 @@ def test_apology_generator():
         product_name="Handtasche"
     )
 
-    print(f"紧急程度: {high_apology.urgency_level}")
-    print(f"主题: {high_apology.subject}")
+    log.info("紧急程度: %s", high_apology.urgency_level)
+    log.info("主题: %s", high_apology.subject)
 
     assert critical_apology.urgency_level == "critical"
     assert high_apology.urgency_level in ["high", "critical"]
-    print("\n✅ 道歉信生成器测试通过!")
-
-
-if __name__ == "__main__":
-    print("="*60)
-    print("GermanMarket.AI 核心模块测试")
-    print("="*60)
-
-    try:
-        test_influencer_evaluator()
-        test_outreach_generator()
-        test_shopify_integration()
-        test_privacy_check()
-        test_apology_generator()
-
-        print("\n" + "="*60)
-        print("🎉 所有测试通过!")
-        print("="*60)
-    except Exception as e:
-        print(f"\n❌ 测试失败: {e}")
-        import traceback
-        traceback.print_exc()
 
+    # 构造后改写评论内容，紧急程度按当前内容判断
+    apology_context = ApologyContext(customer_name="Frau Weber", review_content="Alles gut", review_rating=3)
+    apology_context.review_content = "Ich werde meinen Anwalt einschalten!"
+    assert ApologyGenerator().generate(apology_context).urgency_level == "critical"
+    log.info("\n✅ 道歉信生成器测试通过!")
+
+
+def test_batch_coalescer():
+    """测试请求微批合并（按条数/超时成批、错误隔离、已取消的请求）"""
+    log.info("\n" + "="*50)
+    log.info("测试6: 请求微批合并 (BatchCoalescer)")
+    log.info("="*50)
+
+    async def scenario():
+        calls = []
+
+        async def handler(items):
+            calls.append(list(items))
+            if "bad" in items:
+                raise ValueError("bad input")
+            return [item.upper() for item in items]
+
+        # 凑满 max_batch_size 立即成批；剩余一条等待超时后单独成批
+        coalescer = BatchCoalescer(handler, max_batch_size=2, max_wait_ms=20)
+        futures = [await coalescer.submit(item) for item in ("a", "b", "c")]
+        assert await asyncio.gather(*futures) == ["A", "B", "C"]
+        assert calls == [["a", "b"], ["c"]]
+
+        # 同批中一条出错：整批失败后逐条重试，只有出错的请求收到异常
+        calls.clear()
+        coalescer.max_batch_size = 3
+        futures = [await coalescer.submit(item) for item in ("x", "bad", "y")]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        assert results[0] == "X" and results[2] == "Y"
+        assert isinstance(results[1], ValueError)
+        assert calls[0] == ["x", "bad", "y"]
+
+        # 等待方已取消的请求不再送入批处理
+        calls.clear()
+        cancelled = await coalescer.submit("gone")
+        kept = await coalescer.submit("kept")
+        cancelled.cancel()
+        assert await kept == "KEPT"
+        assert calls == [["kept"]]
+
+        await coalescer.close()
+
+    asyncio.run(scenario())
+    log.info("\n✅ 微批合并测试通过!")